@@ -12,6 +12,7 @@ def register_blueprints(app):
     from app.api.customers import customers_bp
     from app.api.images import images_bp
     from app.api.contact import contact_bp
+    from app.api.reservations import reservations_bp
     
     # Register blueprints
     app.register_blueprint(products_bp)
@@ -19,4 +20,5 @@ def register_blueprints(app):
     app.register_blueprint(admin_bp)
     app.register_blueprint(customers_bp)
     app.register_blueprint(images_bp)
-    app.register_blueprint(contact_bp)
\ No newline at end of file
+    app.register_blueprint(contact_bp)
+    app.register_blueprint(reservations_bp)
\ No newline at end of file
@@ -1,81 +1,161 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from app.models.admin import AdminUser
 from app.models.product import Product
 from app.models.customer import Customer
 from app.models.order import Order
 from app.models.coupon import Coupon
 from app.models.settings import SiteSetting
+from app.models.snapshot import StatsSnapshot
 from app.core.database import db
+from app.utils.pagination import keyset_paginate, InvalidCursor
+from app.utils.dates import parse_date
+from app.utils.export import EXPORT_FORMATS, csv_stream, ndjson_stream
+from app.utils.customer_import import import_customers, InvalidImport
+from app.tasks import DASHBOARD_SNAPSHOT, dashboard_changed
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
+import io
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
+def build_dashboard():
+    """Compute the admin dashboard; served from a snapshot by get_dashboard"""
+    # Basic stats
+    total_products = Product.query.count()
+    total_customers = Customer.query.count()
+    
+    # Order totals, this month's totals and the status breakdown in one scan
+    this_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    order_stats = Order.stats_by_status(since=this_month)
+    total_orders = sum(status['count'] for status in order_stats.values())
+    total_revenue = sum(status['revenue'] for status in order_stats.values())
+    orders_this_month = sum(status['count_since'] for status in order_stats.values())
+    revenue_this_month = sum(status['revenue_since'] for status in order_stats.values())
+    order_statuses = [(name, status['count']) for name, status in order_stats.items()]
+    
+    # Low stock products
+    low_stock_products = Product.query.filter(Product.stock <= 10)\
+                                     .order_by(Product.stock.asc()).limit(5).all()
+    
+    # Recent orders
+    recent_orders = Order.query.options(*Order.summary_options())\
+                               .order_by(Order.created_at.desc()).limit(5).all()
+    
+    # Top selling products (by quantity sold)
+    from app.models.order import OrderItem
+    top_products = db.session.query(
+        Product,
+        func.sum(OrderItem.quantity).label('total_sold')
+    ).join(OrderItem, Product.id == OrderItem.product_id)\
+     .group_by(Product.id)\
+     .order_by(desc('total_sold'))\
+     .limit(5).all()
+    top_products_data = Product.to_dict_list(product for product, _ in top_products)
+    
+    return {
+        'stats': {
+            'total_products': total_products,
+            'total_customers': total_customers,
+            'total_orders': total_orders,
+            'total_revenue': float(total_revenue),
+            'orders_this_month': orders_this_month,
+            'revenue_this_month': float(revenue_this_month)
+        },
+        'order_statuses': [
+            {'status': status, 'count': count}
+            for status, count in order_statuses
+        ],
+        'low_stock_products': Product.to_dict_list(low_stock_products),
+        'recent_orders': [order.to_summary_dict() for order in recent_orders],
+        'top_products': [
+            {
+                'product': product_data,
+                'total_sold': total_sold
+            }
+            for product_data, (_, total_sold) in zip(top_products_data, top_products)
+        ]
+    }
+
+StatsSnapshot.register(DASHBOARD_SNAPSHOT, build_dashboard)
+
 @admin_bp.route('/dashboard', methods=['GET'])
 def get_dashboard():
-    """Get admin dashboard statistics"""
+    """Get admin dashboard statistics from the latest snapshot
+    
+    Order and stock changes queue a refresh, and a snapshot past its TTL
+    is refreshed in the background, so a load is a single-row read.
+    """
     try:
-        # Basic stats
-        total_products = Product.query.count()
-        total_customers = Customer.query.count()
-        total_orders = Order.query.count()
-        
-        # Revenue stats
-        total_revenue = db.session.query(func.sum(Order.total_amount)).scalar() or 0
-        
-        # This month stats
-        this_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        orders_this_month = Order.query.filter(Order.created_at >= this_month).count()
-        revenue_this_month = db.session.query(func.sum(Order.total_amount))\
-                                      .filter(Order.created_at >= this_month).scalar() or 0
-        
-        # Order status breakdown
-        order_statuses = db.session.query(
-            Order.status,
-            func.count(Order.id).label('count')
-        ).group_by(Order.status).all()
-        
-        # Low stock products
-        low_stock_products = Product.query.filter(Product.stock <= 10)\
-                                         .order_by(Product.stock.asc()).limit(5).all()
-        
-        # Recent orders
-        recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
-        
-        # Top selling products (by quantity sold)
-        from app.models.order import OrderItem
-        top_products = db.session.query(
-            Product,
-            func.sum(OrderItem.quantity).label('total_sold')
-        ).join(OrderItem, Product.id == OrderItem.product_id)\
-         .group_by(Product.id)\
-         .order_by(desc('total_sold'))\
-         .limit(5).all()
-        
-        return jsonify({
-            'stats': {
-                'total_products': total_products,
-                'total_customers': total_customers,
-                'total_orders': total_orders,
-                'total_revenue': float(total_revenue),
-                'orders_this_month': orders_this_month,
-                'revenue_this_month': float(revenue_this_month)
-            },
-            'order_statuses': [
-                {'status': status, 'count': count}
-                for status, count in order_statuses
-            ],
-            'low_stock_products': [product.to_dict() for product in low_stock_products],
-            'recent_orders': [order.to_dict() for order in recent_orders],
-            'top_products': [
-                {
-                    'product': product.to_dict(),
-                    'total_sold': total_sold
-                }
-                for product, total_sold in top_products
-            ]
-        })
+        snapshot = StatsSnapshot.fetch(
+            DASHBOARD_SNAPSHOT,
+            ttl=current_app.config['STATS_SNAPSHOT_TTL'],
+            max_age=current_app.config['STATS_SNAPSHOT_MAX_AGE']
+        )
+        return jsonify({**snapshot.data, 'as_of': snapshot.computed_at.isoformat()})
     except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/orders/export', methods=['GET'])
+def export_orders():
+    """Stream orders and their line items for a date range as CSV or NDJSON"""
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        try:
+            start = parse_date(request.args.get('start_date'))
+            end = parse_date(request.args.get('end_date'), end_of_day=True)
+        except ValueError:
+            return jsonify({'error': 'Dates must be ISO formatted, e.g. 2025-01-31'}), 400
+        
+        # The query runs now, so database errors still get a JSON response;
+        # rows are then fetched chunk by chunk as the response is sent
+        rows = Order.export_rows(
+            start=start, end=end, status=request.args.get('status'),
+            chunk_size=current_app.config['ORDER_EXPORT_CHUNK_SIZE']
+        )
+        if export_format == 'csv':
+            # One line per order item, order columns repeated
+            body = csv_stream(rows, Order.EXPORT_COLUMNS + Order.EXPORT_ITEM_COLUMNS)
+        else:
+            # One object per order with its items nested
+            body = ndjson_stream(rows, 'order_id', Order.EXPORT_COLUMNS, 'items', Order.EXPORT_ITEM_COLUMNS)
+        
+        filename = f"orders-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+        return Response(
+            stream_with_context(body),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/customers/import', methods=['POST'])
+def import_customers_file():
+    """Bulk import customers from a CSV or NDJSON file, upserting on email
+    
+    Accepts a multipart upload in 'file' or the raw file as the request
+    body; format comes from ?format= or the file extension.
+    """
+    try:
+        upload = request.files.get('file')
+        filename = upload.filename if upload else ''
+        import_format = request.args.get('format') or \
+            ('ndjson' if filename.endswith(('.ndjson', '.jsonl')) else 'csv')
+        
+        stream = io.TextIOWrapper(upload.stream if upload else request.stream, encoding='utf-8-sig', newline='')
+        report = import_customers(stream, import_format)
+        # Only a committed import changes the dashboard
+        dashboard_changed()
+        db.session.commit()
+        return jsonify(report)
+    except (InvalidImport, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/users', methods=['GET'])
@@ -84,6 +164,17 @@ def get_admin_users():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
+        
+        if cursor is not None:
+            users, next_cursor = keyset_paginate(
+                AdminUser.query, AdminUser.created_at, AdminUser.id, cursor, per_page
+            )
+            return jsonify({
+                'users': [user.to_dict() for user in users],
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            })
         
         users = AdminUser.query.order_by(AdminUser.created_at.desc())\
                               .paginate(page=page, per_page=per_page, error_out=False)
@@ -94,6 +185,8 @@ def get_admin_users():
             'pages': users.pages,
             'current_page': page
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -184,6 +277,17 @@ def get_coupons():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
+        
+        if cursor is not None:
+            coupons, next_cursor = keyset_paginate(
+                Coupon.query, Coupon.created_at, Coupon.id, cursor, per_page
+            )
+            return jsonify({
+                'coupons': [coupon.to_dict() for coupon in coupons],
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            })
         
         coupons = Coupon.query.order_by(Coupon.created_at.desc())\
                              .paginate(page=page, per_page=per_page, error_out=False)
@@ -194,6 +298,8 @@ def get_coupons():
             'pages': coupons.pages,
             'current_page': page
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.core.database import db
 from app.models.contact import ContactMessage
+from app.utils.pagination import keyset_paginate, InvalidCursor
 import os
 from datetime import datetime
 
@@ -60,6 +61,7 @@ def get_contact_messages():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
         status = request.args.get('status', 'all')  # 'all', 'read', 'unread'
 
         query = ContactMessage.query
@@ -69,6 +71,17 @@ def get_contact_messages():
         elif status == 'unread':
             query = query.filter_by(is_read=False)
 
+        if cursor is not None:
+            messages, next_cursor = keyset_paginate(
+                query, ContactMessage.created_at, ContactMessage.id, cursor, per_page
+            )
+            return jsonify({
+                'messages': [message.to_dict() for message in messages],
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None,
+                'unread_count': ContactMessage.query.filter_by(is_read=False).count()
+            })
+
         messages = query.order_by(ContactMessage.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
@@ -80,6 +93,8 @@ def get_contact_messages():
             'current_page': page,
             'unread_count': ContactMessage.query.filter_by(is_read=False).count()
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
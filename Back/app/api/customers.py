@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response, current_app
 from app.models.customer import Customer
 from app.models.order import Order
+from app.models.snapshot import StatsSnapshot
 from app.core.database import db
-from sqlalchemy import func
+from app.utils.pagination import keyset_paginate, InvalidCursor
+from app.utils.idempotency import idempotent, store_response
+from app.tasks import dashboard_changed
 
 customers_bp = Blueprint('customers', __name__, url_prefix='/api/customers')
 
@@ -12,20 +15,29 @@ def get_customers():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
         search = request.args.get('search', '')
         
         query = Customer.query
         
-        if search:
-            query = query.filter(
-                db.or_(
-                    Customer.name.ilike(f'%{search}%'),
-                    Customer.email.ilike(f'%{search}%'),
-                    Customer.phone.ilike(f'%{search}%')
-                )
+        # Searches are ranked by similarity, best match first
+        sort_column, ordering = Customer.created_at, 'created_at'
+        search_match, search_rank = Customer.search(search)
+        if search_match is not None:
+            query = query.filter(search_match)
+            sort_column, ordering = search_rank, 'relevance'
+        
+        if cursor is not None:
+            customers, next_cursor = keyset_paginate(
+                query, sort_column, Customer.id, cursor, per_page, ordering=ordering
             )
+            return jsonify({
+                'customers': [customer.to_dict() for customer in customers],
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            })
         
-        customers = query.order_by(Customer.created_at.desc()).paginate(
+        customers = query.order_by(sort_column.desc(), Customer.id.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
@@ -35,6 +47,8 @@ def get_customers():
             'pages': customers.pages,
             'current_page': page
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -48,6 +62,7 @@ def get_customer(customer_id):
         return jsonify({'error': str(e)}), 500
 
 @customers_bp.route('', methods=['POST'])
+@idempotent
 def create_customer():
     """Create a new customer"""
     try:
@@ -75,9 +90,17 @@ def create_customer():
             postal_code=data.get('postal_code')
         )
         
-        customer.save()
-        return jsonify(customer.to_dict()), 201
+        db.session.add(customer)
+        db.session.flush()
+        dashboard_changed()
+        
+        # The customer and the stored Idempotency-Key response commit together
+        response = make_response(jsonify(customer.to_dict()), 201)
+        store_response(response)
+        db.session.commit()
+        return response
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @customers_bp.route('/<int:customer_id>', methods=['PUT'])
@@ -115,6 +138,7 @@ def delete_customer(customer_id):
         if order_count > 0:
             return jsonify({'error': 'Cannot delete customer with existing orders'}), 400
         
+        dashboard_changed()
         customer.delete()
         return jsonify({'message': 'Customer deleted successfully'})
     except Exception as e:
@@ -127,18 +151,34 @@ def get_customer_orders(customer_id):
         customer = Customer.query.get_or_404(customer_id)
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        cursor = request.args.get('cursor')
+        
+        if cursor is not None:
+            orders, next_cursor = keyset_paginate(
+                Order.query.filter_by(customer_id=customer_id).options(*Order.summary_options()),
+                Order.created_at, Order.id, cursor, per_page
+            )
+            return jsonify({
+                'customer': customer.to_dict(),
+                'orders': [order.to_summary_dict() for order in orders],
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            })
         
         orders = Order.query.filter_by(customer_id=customer_id)\
+                           .options(*Order.summary_options())\
                            .order_by(Order.created_at.desc())\
                            .paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
             'customer': customer.to_dict(),
-            'orders': [order.to_dict() for order in orders.items],
+            'orders': [order.to_summary_dict() for order in orders.items],
             'total': orders.total,
             'pages': orders.pages,
             'current_page': page
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -148,12 +188,14 @@ def get_customer_stats(customer_id):
     try:
         customer = Customer.query.get_or_404(customer_id)
         
+        # Read from the stored aggregates; no order rows are loaded
+        customer_data = customer.to_dict()
         stats = {
-            'customer': customer.to_dict(),
-            'total_orders': customer.total_orders,
-            'total_spent': customer.total_spent,
-            'average_order_value': customer.average_order_value,
-            'last_order_date': customer.last_order_date.isoformat() if customer.last_order_date else None
+            'customer': customer_data,
+            'total_orders': customer_data['total_orders'],
+            'total_spent': customer_data['total_spent'],
+            'average_order_value': customer_data['average_order_value'],
+            'last_order_date': customer_data['last_order_date']
         }
         
         return jsonify(stats)
@@ -162,40 +204,14 @@ def get_customer_stats(customer_id):
 
 @customers_bp.route('/stats', methods=['GET'])
 def get_customers_stats():
-    """Get overall customer statistics"""
+    """Get overall customer statistics from the latest snapshot"""
     try:
-        total_customers = Customer.query.count()
-        
-        # Customers with orders
-        customers_with_orders = db.session.query(Customer.id)\
-                                         .join(Order)\
-                                         .distinct().count()
-        
-        # New customers this month
-        from datetime import datetime, timedelta
-        this_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        new_customers_this_month = Customer.query.filter(Customer.created_at >= this_month).count()
-        
-        # Top customers by spending
-        top_customers = db.session.query(
-            Customer,
-            func.sum(Order.total_amount).label('total_spent')
-        ).join(Order)\
-         .group_by(Customer.id)\
-         .order_by(func.sum(Order.total_amount).desc())\
-         .limit(5).all()
-        
-        return jsonify({
-            'total_customers': total_customers,
-            'customers_with_orders': customers_with_orders,
-            'new_customers_this_month': new_customers_this_month,
-            'top_customers': [
-                {
-                    'customer': customer.to_dict(),
-                    'total_spent': float(total_spent)
-                }
-                for customer, total_spent in top_customers
-            ]
-        })
+        snapshot = StatsSnapshot.fetch(
+            'customers.stats',
+            ttl=current_app.config['STATS_SNAPSHOT_TTL'],
+            max_age=current_app.config['STATS_SNAPSHOT_MAX_AGE']
+        )
+        return jsonify({**snapshot.data, 'as_of': snapshot.computed_at.isoformat()})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -1,21 +1,48 @@
-from flask import Blueprint, request, jsonify
-from app.models.order import Order, OrderItem
+from flask import Blueprint, request, jsonify, make_response
+from app.models.order import Order, OrderItem, ORDER_FIELDS
 from app.models.customer import Customer
 from app.models.product import Product
+from app.models.inventory import InventoryLog
+from app.models.reservation import StockReservation
 from app.core.database import db
+from app.core.cache import cache, product_tag
+from app.utils.pagination import keyset_paginate, InvalidCursor
+from app.utils.fields import parse_fields, load_fields, InvalidFields
+from app.utils.idempotency import idempotent, store_response
+from app.utils.dates import parse_date
+from app.tasks import order_placed, dashboard_changed
 from datetime import datetime
 import uuid
 
 orders_bp = Blueprint('orders', __name__, url_prefix='/api/orders')
 
+def validate_items(items):
+    """Return an error message for a malformed cart, or None"""
+    for item in items:
+        if 'product_id' not in item:
+            return 'Item product_id is required'
+        quantity = item.get('quantity')
+        if not isinstance(quantity, int) or quantity <= 0:
+            return 'Item quantity must be a positive integer'
+    return None
+
+def item_quantities(items):
+    """Total quantity per product, so repeated lines are checked together"""
+    quantities = {}
+    for item in items:
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+    return quantities
+
 @orders_bp.route('', methods=['GET'])
 def get_orders():
     """Get all orders with optional filtering"""
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
         status = request.args.get('status')
         customer_id = request.args.get('customer_id', type=int)
+        fields = parse_fields(request.args.get('fields'), ORDER_FIELDS)
         
         query = Order.query
         
@@ -23,17 +50,35 @@ def get_orders():
             query = query.filter(Order.status == status)
         if customer_id:
             query = query.filter(Order.customer_id == customer_id)
+        # Lists use the compact summary unless specific fields are requested
+        if fields:
+            query = query.options(load_fields(Order, fields, Order.FIELD_COLUMNS),
+                                  *Order.relationship_options(fields))
+            serialize = lambda order: order.to_dict(fields)
+        else:
+            query = query.options(*Order.summary_options())
+            serialize = Order.to_summary_dict
+        
+        if cursor is not None:
+            orders, next_cursor = keyset_paginate(query, Order.created_at, Order.id, cursor, per_page)
+            return jsonify({
+                'orders': [serialize(order) for order in orders],
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            })
             
         orders = query.order_by(Order.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
         return jsonify({
-            'orders': [order.to_dict() for order in orders.items],
+            'orders': [serialize(order) for order in orders.items],
             'total': orders.total,
             'pages': orders.pages,
             'current_page': page
         })
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -41,19 +86,29 @@ def get_orders():
 def get_order(order_id):
     """Get order by ID"""
     try:
-        order = Order.query.get_or_404(order_id)
-        return jsonify(order.to_dict())
+        fields = parse_fields(request.args.get('fields'), ORDER_FIELDS)
+        
+        query = Order.query
+        if fields:
+            query = query.options(load_fields(Order, fields, Order.FIELD_COLUMNS),
+                                  *Order.relationship_options(fields))
+        order = query.get_or_404(order_id)
+        return jsonify(order.to_dict(fields))
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @orders_bp.route('', methods=['POST'])
+@idempotent
 def create_order():
     """Create a new order"""
     try:
         data = request.get_json()
         
-        # Validate required fields
-        required_fields = ['customer_id', 'items', 'shipping_address']
+        # Validate required fields; a reservation brings its own items
+        reservation_token = data.get('reservation_token')
+        required_fields = ['customer_id', 'shipping_address'] + ([] if reservation_token else ['items'])
         for field in required_fields:
             if field not in data or not data[field]:
                 return jsonify({'error': f'{field} is required'}), 400
@@ -63,6 +118,54 @@ def create_order():
         if not customer:
             return jsonify({'error': 'Customer not found'}), 404
         
+        if reservation_token:
+            # Convert the customer's hold taken when checkout started; its
+            # units are already out of stock and logged, so no product rows
+            # are locked and no stock change is logged here
+            items = StockReservation.convert(reservation_token, customer.id)
+            if not items:
+                db.session.rollback()
+                return jsonify({'error': 'Reservation not found or expired'}), 409
+            
+            quantities = item_quantities(items)
+            products = {
+                product.id: product
+                for product in Product.query.filter(Product.id.in_(quantities)).all()
+            }
+            new_stock = None  # nothing changes stock at conversion
+        else:
+            items = data['items']
+            error = validate_items(items)
+            if error:
+                return jsonify({'error': error}), 400
+            quantities = item_quantities(items)
+            
+            # Lock every product in the cart with one query; taking the row locks
+            # in id order keeps concurrent checkouts from deadlocking each other
+            products = {
+                product.id: product
+                for product in Product.query.filter(Product.id.in_(quantities))
+                                            .order_by(Product.id).with_for_update().all()
+            }
+            
+            missing = [product_id for product_id in quantities if product_id not in products]
+            if missing:
+                db.session.rollback()
+                return jsonify({'error': f'Product {missing[0]} not found'}), 404
+            
+            # The decrement itself checks stock, so it cannot oversell
+            new_stock = Product.decrement_stock(quantities)
+            short = [products[product_id] for product_id in quantities if product_id not in new_stock]
+            if short:
+                db.session.rollback()
+                return jsonify({
+                    'error': f'Insufficient stock for {short[0].name}',
+                    'insufficient_stock': [
+                        {'product_id': product.id, 'requested': quantities[product.id], 'available': product.stock}
+                        for product in short
+                    ]
+                }), 400
+        
         # Create order
         order = Order(
             customer_id=data['customer_id'],
@@ -74,16 +177,10 @@ def create_order():
         
         # Add order items
         total_amount = 0
-        for item_data in data['items']:
-            product = Product.query.get(item_data['product_id'])
-            if not product:
-                return jsonify({'error': f'Product {item_data["product_id"]} not found'}), 404
-            
-            if product.stock < item_data['quantity']:
-                return jsonify({'error': f'Insufficient stock for {product.name}'}), 400
-            
+        for item_data in items:
+            product = products[item_data['product_id']]
             order_item = OrderItem(
-                product_id=item_data['product_id'],
+                product_id=product.id,
                 quantity=item_data['quantity'],
                 price=product.price,
                 color=item_data.get('color'),
@@ -91,16 +188,43 @@ def create_order():
             )
             order.order_items.append(order_item)
             total_amount += product.price * item_data['quantity']
-            
-            # Update stock
-            product.update_stock(-item_data['quantity'], 'sale')
         
         # Set order totals
         order.subtotal = total_amount
         order.total_amount = total_amount  # Add shipping/tax logic later if needed
-        order.save()
+        db.session.add(order)
+        db.session.flush()
         
-        return jsonify(order.to_dict()), 201
+        order_count, lifetime_value = Customer.order_contribution(order)
+        customer.record_order_change(order_count, lifetime_value, last_order_at=order.created_at)
+        
+        # Log the stock changes with one multi-row insert (a converted hold
+        # was logged when it was taken)
+        if new_stock is not None:
+            db.session.execute(db.insert(InventoryLog), [
+                {
+                    'product_id': product_id,
+                    'change_type': 'sale',
+                    'quantity_change': -quantity,
+                    'previous_stock': new_stock[product_id] + quantity,
+                    'new_stock': new_stock[product_id],
+                    'reason': f'Order {order.order_number}',
+                    'reference_id': order.id
+                }
+                for product_id, quantity in quantities.items()
+            ])
+        
+        # Emails, rollups and cache invalidation run from the worker; the
+        # jobs commit with the order, so none is lost or run for a rollback
+        order_placed(order, quantities)
+        
+        # Order, items, stock, logs, customer totals, jobs and the stored
+        # Idempotency-Key response succeed or fail together
+        response = make_response(jsonify(order.to_dict()), 201)
+        store_response(response)
+        db.session.commit()
+        
+        return response
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -112,6 +236,11 @@ def update_order(order_id):
         order = Order.query.get_or_404(order_id)
         data = request.get_json()
         
+        if 'payment_status' in data and data['payment_status'] not in Order.PAYMENT_STATUSES:
+            return jsonify({'error': f"payment_status must be one of: {', '.join(Order.PAYMENT_STATUSES)}"}), 400
+        
+        previous = Customer.order_contribution(order)
+        
         if 'status' in data:
             old_status = order.status
             order.status = data['status']
@@ -122,12 +251,22 @@ def update_order(order_id):
             elif data['status'] == 'delivered' and old_status != 'delivered':
                 order.delivered_at = datetime.utcnow()
         
+        if 'payment_status' in data:
+            order.payment_status = data['payment_status']
+        
         if 'tracking_number' in data:
             order.tracking_number = data['tracking_number']
         
+        # Keep the customer's totals in step, in the same transaction
+        current = Customer.order_contribution(order)
+        if order.customer and current != previous:
+            order.customer.record_order_change(current[0] - previous[0], current[1] - previous[1])
+        
+        dashboard_changed()
         order.save()
         return jsonify(order.to_dict())
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @orders_bp.route('/<int:order_id>', methods=['DELETE'])
@@ -138,40 +277,110 @@ def cancel_order(order_id):
         
         if order.status in ['shipped', 'delivered']:
             return jsonify({'error': 'Cannot cancel shipped or delivered orders'}), 400
+        if order.status == 'cancelled':
+            return jsonify({'error': 'Order is already cancelled'}), 409
         
-        # Restore stock
-        for item in order.items:
-            product = Product.query.get(item.product_id)
-            if product:
-                product.update_stock(item.quantity, 'order_cancellation')
+        # Cancels and restocks in one go; an order that is already
+        # cancelled is left alone, so its stock is never restored twice
+        cancelled_ids, restocked = Order.bulk_update_status('cancelled', [Order.id == order_id])
+        if not cancelled_ids:
+            # Its status changed since it was read, e.g. a concurrent cancel
+            db.session.rollback()
+            return jsonify({'error': 'Order can no longer be cancelled'}), 409
         
-        order.status = 'cancelled'
-        order.save()
+        dashboard_changed()
+        db.session.commit()
+        
+        cache.invalidate(*[product_tag(product_id) for product_id in restocked])
         
         return jsonify({'message': 'Order cancelled successfully'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@orders_bp.route('/bulk', methods=['PATCH'])
+def bulk_update_orders():
+    """Change the status of many orders at once, by ids or by filter"""
+    try:
+        data = request.get_json() or {}
+        
+        status = data.get('status')
+        if status not in Order.BULK_TRANSITIONS:
+            return jsonify({'error': f"status must be one of: {', '.join(Order.BULK_TRANSITIONS)}"}), 400
+        
+        conditions = []
+        order_ids = data.get('order_ids')
+        if order_ids is not None:
+            if not isinstance(order_ids, list) or not all(isinstance(order_id, int) for order_id in order_ids):
+                return jsonify({'error': 'order_ids must be a list of integers'}), 400
+            conditions.append(Order.id.in_(order_ids))
+        
+        # Filter: status, customer_id, start_date, end_date
+        criteria = data.get('filter') or {}
+        unknown = set(criteria) - {'status', 'customer_id', 'start_date', 'end_date'}
+        if unknown:
+            return jsonify({'error': f"Unknown filter fields: {', '.join(sorted(unknown))}"}), 400
+        if criteria.get('status'):
+            conditions.append(Order.status == criteria['status'])
+        if criteria.get('customer_id'):
+            conditions.append(Order.customer_id == criteria['customer_id'])
+        try:
+            start = parse_date(criteria.get('start_date'))
+            end = parse_date(criteria.get('end_date'), end_of_day=True)
+        except ValueError:
+            return jsonify({'error': 'Dates must be ISO formatted, e.g. 2025-01-31'}), 400
+        if start:
+            conditions.append(Order.created_at >= start)
+        if end:
+            conditions.append(Order.created_at < end)
+        
+        # Never fall through to updating every order
+        if not conditions:
+            return jsonify({'error': 'order_ids or filter is required'}), 400
+        
+        updated_ids, restocked = Order.bulk_update_status(status, conditions)
+        dashboard_changed()
+        db.session.commit()
+        
+        cache.invalidate(*[product_tag(product_id) for product_id in restocked])
+        
+        response = {
+            'status': status,
+            'updated': len(updated_ids),
+            'order_ids': updated_ids
+        }
+        if order_ids is not None:
+            # Unknown ids and orders whose status does not allow the change
+            response['skipped'] = sorted(set(order_ids) - set(updated_ids))
+        if status == 'cancelled':
+            response['restocked'] = [
+                {'product_id': product_id, 'quantity': quantity}
+                for product_id, quantity in restocked.items()
+            ]
+        return jsonify(response)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @orders_bp.route('/stats', methods=['GET'])
 def get_order_stats():
-    """Get order statistics"""
+    """Get order statistics, optionally for a created_at range"""
     try:
-        from sqlalchemy import func
-        
-        total_orders = Order.query.count()
-        pending_orders = Order.query.filter(Order.status == 'pending').count()
-        shipped_orders = Order.query.filter(Order.status == 'shipped').count()
-        delivered_orders = Order.query.filter(Order.status == 'delivered').count()
+        try:
+            start = parse_date(request.args.get('start_date'))
+            end = parse_date(request.args.get('end_date'), end_of_day=True)
+        except ValueError:
+            return jsonify({'error': 'Dates must be ISO formatted, e.g. 2025-01-31'}), 400
         
-        total_revenue = db.session.query(func.sum(Order.total_amount)).scalar() or 0
+        stats = Order.stats_by_status(start=start, end=end)
         
-        return jsonify({
-            'total_orders': total_orders,
-            'pending_orders': pending_orders,
-            'shipped_orders': shipped_orders,
-            'delivered_orders': delivered_orders,
-            'total_revenue': float(total_revenue)
-        })
+        response = {
+            'total_orders': sum(status['count'] for status in stats.values()),
+            'total_revenue': float(sum(status['revenue'] for status in stats.values())),
+            'status_counts': {name: status['count'] for name, status in stats.items()}
+        }
+        for name, status in stats.items():
+            response[f'{name}_orders'] = status['count']
+        return jsonify(response)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -2,13 +2,49 @@
 Product API endpoints
 """
 
-from flask import Blueprint, request, jsonify
-from sqlalchemy import or_
+import math
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import func
 from app.core.database import db
+from app.core.cache import cache, product_tag, category_tag, CATEGORIES_TAG, BESTSELLERS_TAG
 from app.models import Product, Category, InventoryLog
+from app.models.product import average_rating_expression, PRODUCT_FIELDS
+from app.models.bestseller import product_bestsellers
+from app.utils.pagination import keyset_paginate, InvalidCursor
+from app.utils.conditional import make_validators, not_modified, with_validators
+from app.utils.fields import parse_fields, load_fields, project, InvalidFields
+from app.tasks import dashboard_changed
 
 products_bp = Blueprint('products', __name__, url_prefix='/api/products')
 
+def _latest(*timestamps):
+    """Most recent of the given timestamps, ignoring missing ones"""
+    return max((ts for ts in timestamps if ts is not None), default=None)
+
+def _categories_validators(include_products=False):
+    """Validators for category responses from one count/max(updated_at) query
+
+    These are lists, so they carry an ETag but no Last-Modified.
+    """
+    columns = [func.count(Category.id), func.sum(Category.id), func.max(Category.updated_at)]
+    if include_products:
+        active_products = Product.query.filter(Product.is_active == True)
+        columns += [
+            active_products.with_entities(func.count(Product.id)).scalar_subquery(),
+            active_products.with_entities(func.sum(Product.id)).scalar_subquery(),
+            active_products.with_entities(func.max(Product.updated_at)).scalar_subquery()
+        ]
+    return make_validators(*db.session.query(*columns).one())
+
+def _format_facets(facets, price_boundaries):
+    """Replace width_bucket() numbers with the price range each one covers"""
+    bounds = [None] + list(price_boundaries) + [None]
+    facets['price'] = [
+        {'min': bounds[bucket['value']], 'max': bounds[bucket['value'] + 1], 'count': bucket['count']}
+        for bucket in sorted(facets['price'], key=lambda bucket: bucket['value'])
+    ]
+    return facets
+
 @products_bp.route('', methods=['GET'])
 def get_products():
     """Get all products with optional filtering"""
@@ -16,11 +52,20 @@ def get_products():
         # Query parameters
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')  # opt-in keyset pagination; empty for the first page
         category = request.args.get('category')
         search = request.args.get('search')
+        lang = request.args.get('lang', 'en')  # en, fr, ar
         is_bestseller = request.args.get('is_bestseller', type=bool)
-        sort_by = request.args.get('sort_by', 'created_at')  # name, price, created_at
+        sort_by = request.args.get('sort_by', 'relevance' if search else 'created_at')  # relevance, name, price, rating, created_at
         sort_order = request.args.get('sort_order', 'desc')  # asc, desc
+        colors = request.args.getlist('color')
+        sizes = request.args.getlist('size')
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+        in_stock = request.args.get('in_stock')  # true, false
+        include_facets = request.args.get('facets', 'false').lower() == 'true'
+        fields = parse_fields(request.args.get('fields'), PRODUCT_FIELDS)  # e.g. id,name,price,image_url
         
         # Build query
         query = Product.query.filter_by(is_active=True)
@@ -29,28 +74,119 @@ def get_products():
         if category:
             query = query.join(Category).filter(Category.name == category)
         
+        search_rank = None
         if search:
-            query = query.filter(or_(
-                Product.name.ilike(f'%{search}%'),
-                Product.description.ilike(f'%{search}%')
-            ))
+            search_match, search_rank = Product.search(search, lang)
+            if search_match is not None:
+                query = query.filter(search_match)
         
         if is_bestseller is not None:
             query = query.filter_by(is_bestseller=is_bestseller)
         
+        # Array filters match any of the requested values (GIN-indexed &&)
+        if colors:
+            query = query.filter(Product.color_options.overlap(colors))
+        
+        if sizes:
+            query = query.filter(Product.size_options.overlap(sizes))
+        
+        if min_price is not None:
+            query = query.filter(Product.price >= min_price)
+        
+        if max_price is not None:
+            query = query.filter(Product.price <= max_price)
+        
+        if in_stock == 'true':
+            query = query.filter(Product.stock > 0)
+        elif in_stock == 'false':
+            query = query.filter(Product.stock <= 0)
+        
+        # Conditional GET: the page can only change if a product joined,
+        # left or changed in the filtered set or a category changed, which a
+        # single aggregate shows (the sum of ids catches one product
+        # swapped for another)
+        product_count, product_ids_sum, products_updated_at, categories_updated_at = query.with_entities(
+            func.count(Product.id),
+            func.sum(Product.id),
+            func.max(Product.updated_at),
+            db.session.query(func.max(Category.updated_at)).scalar_subquery()
+        ).one()
+        validators = make_validators(product_count, product_ids_sum, products_updated_at, categories_updated_at)
+        cached_response = not_modified(validators)
+        if cached_response:
+            return cached_response
+        
         # Apply sorting
-        if sort_by == 'name':
-            query = query.order_by(Product.name.asc() if sort_order == 'asc' else Product.name.desc())
-        elif sort_by == 'price':
-            query = query.order_by(Product.price.asc() if sort_order == 'asc' else Product.price.desc())
-        else:  # created_at
-            query = query.order_by(Product.created_at.asc() if sort_order == 'asc' else Product.created_at.desc())
+        sort_columns = {
+            'name': Product.name,
+            'price': Product.price,
+            'rating': average_rating_expression,
+            'created_at': Product.created_at
+        }
+        if sort_by == 'relevance' and search_rank is not None:
+            sort_column, descending = search_rank, True
+        else:
+            if sort_by not in sort_columns:
+                sort_by = 'created_at'
+            sort_column, descending = sort_columns[sort_by], sort_order != 'asc'
+        
+        price_boundaries = current_app.config['PRICE_FACET_BOUNDARIES']
+        facets_column = Product.facet_counts(query, price_boundaries) if include_facets else None
+        
+        # Only load the columns behind the requested fields
+        if fields:
+            query = query.options(load_fields(Product, fields, Product.FIELD_COLUMNS))
+        
+        # Keyset pagination (opt-in): seeks past the cursor, no OFFSET or COUNT
+        if cursor is not None:
+            products, next_cursor = keyset_paginate(
+                query, sort_column, Product.id, cursor, per_page,
+                descending=descending, ordering=sort_by
+            )
+            response = {
+                'products': Product.to_dict_list(products, fields),
+                'pagination': {
+                    'per_page': per_page,
+                    'next_cursor': next_cursor,
+                    'has_next': next_cursor is not None
+                }
+            }
+            if include_facets:
+                response['facets'] = _format_facets(db.session.query(facets_column).scalar(), price_boundaries)
+            return with_validators(jsonify(response), validators)
+        
+        query = query.order_by(sort_column.desc() if descending else sort_column.asc())
+        
+        # Facets mode: the counts come back as an extra column of the page
+        # query, and the total is the count already taken for the validators
+        if include_facets:
+            page, per_page = max(page, 1), max(per_page, 1)
+            rows = query.add_columns(facets_column)\
+                        .limit(per_page).offset((page - 1) * per_page).all()
+            if rows:
+                facets = rows[0][1]
+            else:
+                facets = db.session.query(facets_column).scalar()
+            pages = math.ceil(product_count / per_page)
+            
+            return with_validators(jsonify({
+                'products': Product.to_dict_list((row[0] for row in rows), fields),
+                'facets': _format_facets(facets, price_boundaries),
+                'pagination': {
+                    'page': page,
+                    'pages': pages,
+                    'per_page': per_page,
+                    'total': product_count,
+                    'has_next': page < pages,
+                    'has_prev': page > 1
+                }
+            }), validators)
         
         # Paginate
         products = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        return jsonify({
-            'products': [product.to_dict() for product in products.items],
+        return with_validators(jsonify({
+            'products': Product.to_dict_list(products.items, fields),
             'pagination': {
                 'page': products.page,
                 'pages': products.pages,
@@ -59,8 +195,10 @@ def get_products():
                 'has_next': products.has_next,
                 'has_prev': products.has_prev
             }
-        })
+        }), validators)
         
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -68,12 +206,37 @@ def get_products():
 def get_product(product_id):
     """Get single product by ID"""
     try:
-        product = Product.query.filter_by(id=product_id, is_active=True).first()
-        if not product:
+        fields = parse_fields(request.args.get('fields'), PRODUCT_FIELDS)
+        
+        # Validators come from the product's and its category's timestamps only
+        timestamps = db.session.query(Product.updated_at, Category.updated_at)\
+                               .outerjoin(Category, Product.category_id == Category.id)\
+                               .filter(Product.id == product_id, Product.is_active == True).first()
+        if not timestamps:
             return jsonify({'error': 'Product not found'}), 404
         
-        return jsonify({'product': product.to_dict()})
+        validators = make_validators(product_id, *timestamps, last_modified=_latest(*timestamps))
+        cached_response = not_modified(validators)
+        if cached_response:
+            return cached_response
+        
+        # Keyed by the validators' state, so a stale entry is never sent under a fresh ETag
+        cache_key = f'products:detail:{product_id}:{validators.version}'
+        payload = cache.get(cache_key)
+        if payload is None:
+            product = Product.query.filter_by(id=product_id, is_active=True).first()
+            if not product:
+                return jsonify({'error': 'Product not found'}), 404
+            
+            payload = {'product': product.to_dict()}
+            cache.set(cache_key, payload, tags=[product_tag(product.id), category_tag(product.category_id)])
         
+        # The cache holds the full product; trimming it is cheaper than a reload
+        payload = {'product': project(payload['product'], fields)}
+        return with_validators(jsonify(payload), validators)
+        
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -108,8 +271,12 @@ def create_product():
             dimensions=data.get('dimensions')
         )
         
+        dashboard_changed()
         product.save()
         
+        # A new product can appear in its category's featured list and in bestsellers
+        cache.invalidate(category_tag(product.category_id), BESTSELLERS_TAG if product.is_bestseller else None)
+        
         return jsonify({'product': product.to_dict()}), 201
         
     except Exception as e:
@@ -122,6 +289,9 @@ def update_product(product_id):
         product = Product.query.get_or_404(product_id)
         data = request.get_json()
         
+        previous_category_id = product.category_id
+        was_bestseller = product.is_bestseller
+        
         # Update fields
         updatable_fields = [
             'name', 'description', 'price', 'original_price', 'stock',
@@ -133,8 +303,16 @@ def update_product(product_id):
             if field in data:
                 setattr(product, field, data[field])
         
+        dashboard_changed()
         product.save()
         
+        cache.invalidate(
+            product_tag(product.id),
+            category_tag(previous_category_id),
+            category_tag(product.category_id),
+            BESTSELLERS_TAG if was_bestseller or product.is_bestseller else None
+        )
+        
         return jsonify({'product': product.to_dict()})
         
     except Exception as e:
@@ -146,8 +324,12 @@ def delete_product(product_id):
     try:
         product = Product.query.get_or_404(product_id)
         product.is_active = False
+        dashboard_changed()
         product.save()
         
+        # Its slot in the category's featured list goes to another product
+        cache.invalidate(product_tag(product.id), category_tag(product.category_id))
+        
         return jsonify({'message': 'Product deleted successfully'})
         
     except Exception as e:
@@ -157,10 +339,21 @@ def delete_product(product_id):
 def get_categories():
     """Get all product categories"""
     try:
-        categories = Category.query.all()
-        return jsonify({
-            'categories': [category.to_dict() for category in categories]
-        })
+        validators = _categories_validators()
+        cached_response = not_modified(validators)
+        if cached_response:
+            return cached_response
+        
+        cache_key = f'products:categories:{validators.version}'
+        payload = cache.get(cache_key)
+        if payload is None:
+            categories = Category.query.all()
+            payload = {
+                'categories': [category.to_dict() for category in categories]
+            }
+            cache.set(cache_key, payload, tags=[CATEGORIES_TAG])
+        
+        return with_validators(jsonify(payload), validators)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -171,38 +364,85 @@ def get_categories_with_featured_products():
     try:
         limit = request.args.get('limit', 3, type=int)  # Number of featured products per category
         
+        validators = _categories_validators(include_products=True)
+        cached_response = not_modified(validators)
+        if cached_response:
+            return cached_response
+        
+        cache_key = f'products:categories:featured:{limit}:{validators.version}'
+        payload = cache.get(cache_key)
+        if payload is not None:
+            return with_validators(jsonify(payload), validators)
+        
         categories = Category.query.all()
-        category_previews = {}
-        
-        for category in categories:
-            # Get featured products for this category (recently added, active products)
-            featured_products = Product.query.filter_by(
-                category_id=category.id,
-                is_active=True
-            ).order_by(Product.created_at.desc()).limit(limit).all()
-            
-            category_previews[str(category.id)] = [product.to_dict() for product in featured_products]
         
-        return jsonify({
+        # Featured products are the most recently added active products of each
+        # category, numbered per category so all of them come back in one query
+        ranked = db.session.query(
+            Product.id,
+            func.row_number().over(
+                partition_by=Product.category_id,
+                order_by=(Product.created_at.desc(), Product.id.desc())
+            ).label('position')
+        ).filter(Product.is_active == True, Product.category_id.isnot(None)).subquery()
+        
+        featured_products = Product.query.join(ranked, Product.id == ranked.c.id)\
+                                         .filter(ranked.c.position <= limit)\
+                                         .order_by(Product.category_id, ranked.c.position).all()
+        
+        category_previews = {str(category.id): [] for category in categories}
+        for product, product_data in zip(featured_products, Product.to_dict_list(featured_products)):
+            category_previews[str(product.category_id)].append(product_data)
+        
+        payload = {
             'categories': [category.to_dict() for category in categories],
             'categoryPreviews': category_previews
-        })
+        }
+        tags = [CATEGORIES_TAG]
+        tags += [category_tag(category.id) for category in categories]
+        tags += [product_tag(product['id']) for previews in category_previews.values() for product in previews]
+        cache.set(cache_key, payload, tags=tags)
+        
+        return with_validators(jsonify(payload), validators)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @products_bp.route('/bestsellers', methods=['GET'])
 def get_bestsellers():
-    """Get bestseller products"""
+    """Get bestseller products ranked by units sold"""
     try:
-        # Always return top 3 bestsellers, sorted by created_at desc (or sales if available)
-        bestsellers = Product.query.filter_by(
-            is_active=True,
-            is_bestseller=True
-        ).order_by(Product.created_at.desc()).limit(3).all()
-        return jsonify({
-            'bestsellers': [product.to_dict() for product in bestsellers]
-        })
+        limit = request.args.get('limit', 3, type=int)
+        category_id = request.args.get('category_id', type=int)
+        
+        cache_key = f'products:bestsellers:{limit}:{category_id}'
+        payload = cache.get(cache_key)
+        if payload is None:
+            # Ranking is precomputed in the product_bestsellers materialized view
+            query = Product.query.join(
+                product_bestsellers, Product.id == product_bestsellers.c.product_id
+            ).filter(Product.is_active == True)
+            if category_id:
+                query = query.filter(product_bestsellers.c.category_id == category_id)\
+                             .order_by(product_bestsellers.c.category_rank)
+            else:
+                query = query.order_by(product_bestsellers.c.overall_rank)
+            bestsellers = query.limit(limit).all()
+            
+            # No sales in the window yet: fall back to hand-picked bestsellers
+            if not bestsellers:
+                query = Product.query.filter_by(is_active=True, is_bestseller=True)
+                if category_id:
+                    query = query.filter_by(category_id=category_id)
+                bestsellers = query.order_by(Product.created_at.desc()).limit(limit).all()
+            
+            payload = {
+                'bestsellers': Product.to_dict_list(bestsellers)
+            }
+            tags = [BESTSELLERS_TAG] + [product_tag(product.id) for product in bestsellers]
+            cache.set(cache_key, payload, tags=tags)
+        
+        return jsonify(payload)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -219,7 +459,9 @@ def update_stock(product_id):
         if quantity_change is None:
             return jsonify({'error': 'quantity_change is required'}), 400
         
+        dashboard_changed()
         product.update_stock(quantity_change, reason)
+        cache.invalidate(product_tag(product.id))
         
         return jsonify({'product': product.to_dict()})
         
@@ -0,0 +1,85 @@
+"""
+Stock reservation API endpoints
+Checkout takes a hold here, then places the order with its token
+"""
+
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from app.core.database import db
+from app.core.cache import cache, product_tag
+from app.models.reservation import StockReservation
+from app.models.product import Product
+from app.api.orders import validate_items
+
+reservations_bp = Blueprint('reservations', __name__, url_prefix='/api/reservations')
+
+@reservations_bp.route('', methods=['POST'])
+def create_reservation():
+    """Hold stock for a cart while the customer completes checkout"""
+    try:
+        data = request.get_json()
+
+        items = data.get('items') if data else None
+        if not items:
+            return jsonify({'error': 'items is required'}), 400
+
+        error = validate_items(items)
+        if error:
+            return jsonify({'error': error}), 400
+
+        product_ids = {item['product_id'] for item in items}
+        products = Product.query.filter(Product.id.in_(product_ids), Product.is_active == True).all()
+        if len(products) != len(product_ids):
+            missing = product_ids - {product.id for product in products}
+            return jsonify({'error': f'Product {min(missing)} not found'}), 404
+
+        ttl = timedelta(minutes=current_app.config['RESERVATION_TTL_MINUTES'])
+        reservations, short = StockReservation.hold(items, ttl, customer_id=data.get('customer_id'))
+        if short:
+            db.session.rollback()
+            return jsonify({
+                'error': 'Insufficient stock',
+                'insufficient_stock': short
+            }), 400
+
+        db.session.commit()
+        cache.invalidate(*[product_tag(product_id) for product_id in product_ids])
+
+        return jsonify({
+            'token': reservations[0].token,
+            'expires_at': reservations[0].expires_at.isoformat(),
+            'items': [reservation.to_dict() for reservation in reservations]
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@reservations_bp.route('/<token>', methods=['GET'])
+def get_reservation(token):
+    """Get the lines of a live hold"""
+    try:
+        reservations = StockReservation.query.filter_by(token=token)\
+            .filter(StockReservation.expires_at > datetime.utcnow()).all()
+        if not reservations:
+            return jsonify({'error': 'Reservation not found or expired'}), 404
+
+        return jsonify({
+            'token': token,
+            'expires_at': reservations[0].expires_at.isoformat(),
+            'items': [reservation.to_dict() for reservation in reservations]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reservations_bp.route('/<token>', methods=['DELETE'])
+def release_reservation(token):
+    """Give a hold's units back to stock (e.g. the customer left checkout)"""
+    try:
+        released = StockReservation.release(token)
+        db.session.commit()
+        cache.invalidate(*[product_tag(product_id) for product_id in released])
+
+        return jsonify({'message': 'Reservation released', 'released_units': sum(released.values())})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,101 @@
+"""
+Flask CLI commands
+Run with: flask --app run <command>
+"""
+
+import click
+from flask.cli import with_appcontext
+
+def register_commands(app):
+    """Register CLI commands with the Flask app"""
+    app.cli.add_command(refresh_bestsellers_command)
+    app.cli.add_command(sweep_reservations_command)
+    app.cli.add_command(cleanup_idempotency_keys_command)
+    app.cli.add_command(create_partitions_command)
+    app.cli.add_command(import_customers_command)
+
+@click.command('refresh-bestsellers')
+@click.option('--days', type=int, help='Change the sales window (in days) before refreshing')
+@with_appcontext
+def refresh_bestsellers_command(days):
+    """Recompute the bestseller ranking (schedule this, e.g. from cron)"""
+    from app.core.cache import cache, BESTSELLERS_TAG
+    from app.models.bestseller import refresh_bestsellers, WINDOW_SETTING_KEY
+    from app.models.settings import SiteSetting
+    
+    if days is not None:
+        if days < 1:
+            raise click.BadParameter('must be at least 1', param_hint='--days')
+        SiteSetting.set_setting(WINDOW_SETTING_KEY, days, 'Bestseller sales window in days', 'number')
+    
+    refresh_bestsellers()
+    cache.invalidate(BESTSELLERS_TAG)
+    click.echo('✅ Bestseller ranking refreshed')
+
+
+@click.command('sweep-reservations')
+@with_appcontext
+def sweep_reservations_command():
+    """Return the stock of expired checkout holds (worker.py also does this every minute)"""
+    from app.core.database import db
+    from app.core.cache import cache, product_tag
+    from app.models.reservation import StockReservation
+    
+    released = StockReservation.sweep_expired()
+    db.session.commit()
+    cache.invalidate(*[product_tag(product_id) for product_id in released])
+    click.echo(f'✅ Released {sum(released.values())} reserved units')
+
+
+@click.command('cleanup-idempotency-keys')
+@with_appcontext
+def cleanup_idempotency_keys_command():
+    """Delete expired Idempotency-Key records (schedule this daily)"""
+    from app.models.idempotency import IdempotencyKey
+    
+    deleted = IdempotencyKey.delete_expired()
+    click.echo(f'✅ Deleted {deleted} expired idempotency keys')
+
+
+@click.command('create-partitions')
+@click.option('--months-ahead', type=int, help='Months to create beyond the current one')
+@with_appcontext
+def create_partitions_command(months_ahead):
+    """Create the upcoming monthly partitions of orders, order_items and inventory_logs"""
+    from flask import current_app
+    from app.core.partitions import ensure_partitions
+    
+    if months_ahead is None:
+        months_ahead = current_app.config['PARTITION_MONTHS_AHEAD']
+    created = ensure_partitions(months_ahead)
+    click.echo(f"✅ Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+
+
+@click.command('import-customers')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(['csv', 'ndjson']),
+              help='File format (default: from the extension, else csv)')
+@with_appcontext
+def import_customers_command(path, import_format):
+    """Bulk import customers from a CSV or NDJSON file, upserting on email"""
+    from app.core.database import db
+    from app.utils.customer_import import import_customers, InvalidImport
+    from app.tasks import dashboard_changed
+    
+    if import_format is None:
+        import_format = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+    
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        try:
+            report = import_customers(stream, import_format)
+        except (InvalidImport, UnicodeDecodeError) as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+    
+    # Only a committed import changes the dashboard
+    dashboard_changed()
+    db.session.commit()
+    
+    for error in report['errors']:
+        click.echo(f"  line {error['line']}: {error['error']}")
+    click.echo(f"✅ Inserted {report['inserted']}, updated {report['updated']}, rejected {report['rejected']} customers")
@@ -0,0 +1,171 @@
+"""
+Response cache with tag-based invalidation
+Uses Redis when it is reachable, otherwise a bounded in-process LRU
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # Redis is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Tags shared by the endpoints that cache and the writes that invalidate
+CATEGORIES_TAG = 'categories'
+BESTSELLERS_TAG = 'bestsellers'
+
+def product_tag(product_id):
+    """Tag for every cache entry that contains the given product"""
+    return f'product:{product_id}'
+
+def category_tag(category_id):
+    """Tag for every cache entry built from the given category"""
+    return f'category:{category_id}' if category_id is not None else None
+
+class LRUBackend:
+    """Bounded in-process store; entries are dropped least recently used first
+
+    Each worker process has its own copy, so invalidation only reaches the
+    process that made the write; other workers catch up when entries expire.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, tags, timeout):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + timeout, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, set()):
+                    self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+class RedisBackend:
+    """Shared store; each tag is a Redis set holding the keys tagged with it"""
+
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, tags, timeout):
+        pipe = self.client.pipeline()
+        pipe.setex(self.prefix + key, timeout, value)
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            pipe.sadd(tag_key, self.prefix + key)
+            pipe.expire(tag_key, timeout)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        tag_keys = [self.prefix + 'tag:' + tag for tag in tags]
+        pipe = self.client.pipeline()
+        for tag_key in tag_keys:
+            pipe.smembers(tag_key)
+        members = pipe.execute()
+
+        keys = set(tag_keys)
+        for tag_members in members:
+            keys.update(tag_members)
+        self.client.delete(*keys)
+
+class Cache:
+    """Cache for JSON payloads, keyed by string and tagged for invalidation"""
+
+    def __init__(self):
+        self.backend = None
+        self.default_timeout = 300
+
+    def init_app(self, app):
+        self.default_timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        self.backend = None
+
+        redis_url = app.config.get('REDIS_URL')
+        if redis is not None and redis_url:
+            try:
+                client = redis.Redis.from_url(redis_url, socket_connect_timeout=0.5, socket_timeout=0.5)
+                client.ping()
+                self.backend = RedisBackend(client, app.config.get('CACHE_KEY_PREFIX', 'ourstore:'))
+            except redis.RedisError:
+                app.logger.info('Redis unavailable, using in-process cache')
+
+        if self.backend is None:
+            self.backend = LRUBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+
+        app.extensions['cache'] = self
+
+    @property
+    def is_shared(self):
+        """Whether every process sees the same entries (Redis) or its own (LRU)"""
+        return isinstance(self.backend, RedisBackend)
+    
+    def get(self, key):
+        """Return the cached payload for key, or None on a miss"""
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            # A cache outage must never fail the request; treat it as a miss
+            logger.exception('Cache read failed for %s', key)
+            return None
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, payload, tags=(), timeout=None):
+        """Store a JSON-serializable payload under key with the given tags"""
+        try:
+            self.backend.set(key, json.dumps(payload), {tag for tag in tags if tag},
+                             timeout or self.default_timeout)
+        except Exception:
+            logger.exception('Cache write failed for %s', key)
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of the given tags"""
+        tags = {tag for tag in tags if tag}
+        if not tags:
+            return
+        try:
+            self.backend.invalidate(tags)
+        except Exception:
+            logger.exception('Cache invalidation failed for %s', sorted(tags))
+
+# Initialize cache instance
+cache = Cache()
@@ -0,0 +1,243 @@
+"""
+Background job queue
+Non-critical work (emails, rollups, cache invalidation) is enqueued inside the
+request's transaction and run later by worker.py
+
+Backends:
+    database - jobs are rows in background_jobs, polled with SKIP LOCKED;
+               needs nothing but PostgreSQL (used in development and tests)
+    celery   - jobs are sent to a Celery broker (Redis) once the request's
+               transaction commits
+Both retry failed jobs with exponential backoff and move jobs that run out
+of attempts to the dead_letter_jobs table.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event, select, delete, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
+from app.core.database import db
+from app.models.job import BackgroundJob, DeadLetterJob
+
+try:
+    import celery
+except ImportError:  # Celery is optional; the database backend needs nothing extra
+    celery = None
+
+logger = logging.getLogger(__name__)
+
+CELERY_TASK_NAME = 'ourstore.run_job'
+
+def job(name, max_attempts=None):
+    """Register a function as a job; its keyword arguments come from the payload"""
+    def decorator(func):
+        jobs.registry[name] = (func, max_attempts)
+        return func
+    return decorator
+
+def enqueue(name, payload=None, delay=0, dedupe_key=None):
+    """Queue a job as part of the current transaction"""
+    jobs.enqueue(name, payload, delay, dedupe_key)
+
+def after_commit(callback):
+    """Run callback once the current transaction commits; dropped on rollback"""
+    db.session.info.setdefault('after_commit', []).append(callback)
+
+def _run_after_commit(session):
+    for callback in session.info.pop('after_commit', []):
+        try:
+            callback()
+        except Exception:
+            logger.exception('After-commit callback failed')
+
+def _discard_after_commit(session):
+    session.info.pop('after_commit', None)
+
+class JobQueue:
+    """Job registry plus the configured backend"""
+
+    def __init__(self):
+        self.registry = {}
+        self.app = None
+        self.celery = None
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['jobs'] = self
+
+        if not event.contains(db.session, 'after_commit', _run_after_commit):
+            event.listen(db.session, 'after_commit', _run_after_commit)
+            event.listen(db.session, 'after_rollback', _discard_after_commit)
+
+        # Register the application's jobs
+        from app import tasks  # noqa: F401
+
+        if app.config['JOBS_BACKEND'] == 'celery':
+            if celery is None:
+                raise RuntimeError('JOBS_BACKEND is "celery" but Celery is not installed')
+            self.celery = self._make_celery(app)
+
+    @property
+    def backend(self):
+        return self.app.config['JOBS_BACKEND']
+
+    def retry_delay(self, attempts):
+        """Exponential backoff: base, 2x base, 4x base, ... capped"""
+        base = self.app.config['JOB_RETRY_BASE_SECONDS']
+        return min(base * 2 ** (attempts - 1), self.app.config['JOB_RETRY_MAX_SECONDS'])
+
+    def max_attempts(self, name):
+        _, max_attempts = self.registry[name]
+        return max_attempts or self.app.config['JOB_MAX_ATTEMPTS']
+
+    def enqueue(self, name, payload=None, delay=0, dedupe_key=None):
+        if name not in self.registry:
+            raise ValueError(f'Unknown job: {name}')
+        payload = payload or {}
+
+        if self.backend == 'celery':
+            # Publish only if the transaction that wanted the job commits
+            after_commit(lambda: self.celery.send_task(
+                CELERY_TASK_NAME, args=[name, payload], countdown=delay or None
+            ))
+            return
+
+        # ON CONFLICT keeps a single queued job per dedupe_key
+        db.session.execute(
+            insert(BackgroundJob)
+            .values(name=name, payload=payload, status='queued', attempts=0,
+                    run_at=datetime.utcnow() + timedelta(seconds=delay),
+                    dedupe_key=dedupe_key, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=['dedupe_key'],
+                                    index_where=BackgroundJob.status == 'queued')
+        )
+
+    def run(self, name, payload):
+        """Run a job in the current app context; the caller commits"""
+        func, _ = self.registry[name]
+        func(**payload)
+
+    def dead_letter(self, name, payload, attempts, error):
+        db.session.add(DeadLetterJob(name=name, payload=payload, attempts=attempts, last_error=error))
+        logger.error('Job %s failed after %s attempts: %s', name, attempts, error)
+
+    # Database backend
+
+    def run_pending(self, limit=10):
+        """Claim and run up to limit due jobs; returns how many were claimed
+
+        FOR UPDATE SKIP LOCKED lets several workers poll the same table
+        without ever claiming the same job twice.
+        """
+        now = datetime.utcnow()
+
+        # Jobs whose worker died mid-run go back in the queue
+        self._requeue_stale(now - timedelta(seconds=self.app.config['JOB_LOCK_TIMEOUT']))
+
+        claimed = BackgroundJob.query.filter(BackgroundJob.status == 'queued', BackgroundJob.run_at <= now)\
+            .order_by(BackgroundJob.run_at).limit(limit).with_for_update(skip_locked=True).all()
+        for background_job in claimed:
+            background_job.status = 'running'
+            background_job.locked_at = now
+            background_job.attempts += 1
+        db.session.commit()
+
+        for background_job in claimed:
+            self._run_claimed(background_job.id)
+        return len(claimed)
+
+    def _requeue_stale(self, stale_before):
+        """Put running jobs locked before stale_before back in the queue
+
+        Only one queued job may hold a dedupe_key, so a stale job is
+        dropped instead when a queued copy (or a newer stale copy) will do
+        the same work, as _run_claimed does for failed jobs. Requeuing it
+        would violate uq_background_jobs_queued_dedupe_key and fail every
+        later poll.
+        """
+        stale = (BackgroundJob.status == 'running') & (BackgroundJob.locked_at < stale_before)
+        other = aliased(BackgroundJob)
+        duplicate = select(other.id).where(
+            other.dedupe_key == BackgroundJob.dedupe_key,
+            (other.status == 'queued') | (
+                (other.status == 'running') & (other.locked_at < stale_before) & (other.id > BackgroundJob.id)
+            )
+        ).exists()
+        db.session.execute(
+            delete(BackgroundJob).where(stale, BackgroundJob.dedupe_key.isnot(None), duplicate)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            update(BackgroundJob).where(stale).values(status='queued', locked_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _run_claimed(self, job_id):
+        background_job = BackgroundJob.query.get(job_id)
+        name, payload, attempts = background_job.name, background_job.payload, background_job.attempts
+        try:
+            self.run(name, payload)
+            # The job's writes and the removal of its row commit together
+            db.session.delete(background_job)
+            db.session.commit()
+            return
+        except Exception as e:
+            db.session.rollback()
+            error = f'{type(e).__name__}: {e}'
+            logger.warning('Job %s (attempt %s) failed: %s', name, attempts, error)
+
+        background_job = BackgroundJob.query.get(job_id)
+        if attempts >= self.max_attempts(name):
+            self.dead_letter(name, payload, attempts, error)
+            db.session.delete(background_job)
+        elif background_job.dedupe_key and BackgroundJob.query.filter_by(
+                dedupe_key=background_job.dedupe_key, status='queued').first():
+            # A newer copy is already queued and will do the same work
+            db.session.delete(background_job)
+        else:
+            background_job.status = 'queued'
+            background_job.locked_at = None
+            background_job.last_error = error
+            background_job.run_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(attempts))
+        db.session.commit()
+
+    def work(self, poll_interval=None, stop=None):
+        """Poll for jobs until stop() returns True (or forever)"""
+        poll_interval = poll_interval or self.app.config['JOB_POLL_INTERVAL']
+        while not (stop and stop()):
+            try:
+                claimed = self.run_pending()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Job polling failed')
+                claimed = 0
+            if not claimed:
+                time.sleep(poll_interval)
+
+    # Celery backend
+
+    def _make_celery(self, app):
+        celery_app = celery.Celery(app.import_name, broker=app.config['CELERY_BROKER_URL'])
+        celery_app.conf.task_acks_late = True  # a job lost with its worker is redelivered
+
+        @celery_app.task(name=CELERY_TASK_NAME, bind=True, max_retries=None)
+        def run_job(task, name, payload):
+            with app.app_context():
+                attempts = task.request.retries + 1
+                try:
+                    self.run(name, payload)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    if attempts >= self.max_attempts(name):
+                        self.dead_letter(name, payload, attempts, f'{type(e).__name__}: {e}')
+                        db.session.commit()
+                        return
+                    raise task.retry(exc=e, countdown=self.retry_delay(attempts))
+
+        return celery_app
+
+# Initialize job queue instance
+jobs = JobQueue()
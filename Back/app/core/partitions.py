@@ -0,0 +1,88 @@
+"""
+Monthly range partitions
+orders, order_items and inventory_logs are partitioned by month on
+created_at; this module creates the partitions ahead of time
+
+Each table has one partition per month (orders_y2026m01, ...) plus a
+default partition (orders_default) that catches rows no monthly partition
+covers yet, so an insert never fails for lack of a partition.
+"""
+
+from datetime import datetime
+from sqlalchemy import DDL, text
+from app.core.database import db
+
+PARTITIONED_TABLES = ('orders', 'order_items', 'inventory_logs')
+
+def month_start(value):
+    """First instant of the month containing value"""
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(month, count):
+    """Start of the month count months after month"""
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+def partition_name(table, month):
+    return f'{table}_y{month.year}m{month.month:02d}'
+
+def default_partition_ddl(table):
+    """DDL for the catch-all partition of a partitioned table"""
+    return DDL(f'CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT')
+
+def existing_partitions(table):
+    """Names of the partitions currently attached to table"""
+    return set(db.session.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), {'table': table}).scalars())
+
+def create_partition(table, month):
+    """Create the partition of table for one month
+
+    The partition is built detached, any rows for the month are moved
+    into it from the default partition, and it is then attached; creating
+    it directly would fail once the default partition holds such rows.
+    """
+    name = partition_name(table, month)
+    lower, upper = month, add_months(month, 1)
+
+    db.session.execute(text(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    db.session.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {table}_default
+            WHERE created_at >= :lower AND created_at < :upper
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {'lower': lower, 'upper': upper})
+    # Indexes, the primary key and foreign keys are cloned from the parent
+    db.session.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    ))
+    return name
+
+def ensure_partitions(months_ahead=3, now=None):
+    """Create missing monthly partitions and commit; returns their names
+
+    Covers the current month, the next months_ahead months and any month
+    that already has rows in a default partition.
+    """
+    current = month_start(now or datetime.utcnow())
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = existing_partitions(table)
+        months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+        months.update(db.session.execute(
+            text(f"SELECT DISTINCT date_trunc('month', created_at) FROM {table}_default")
+        ).scalars())
+
+        for month in sorted(months):
+            if partition_name(table, month) not in existing:
+                created.append(create_partition(table, month))
+    db.session.commit()
+    return created
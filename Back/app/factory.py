@@ -28,6 +28,12 @@ def create_app(config_name=None):
     from app.core.database import db
     db.init_app(app)
     
+    from app.core.cache import cache
+    cache.init_app(app)
+    
+    from app.core.jobs import jobs
+    jobs.init_app(app)
+    
     # CORS configuration
     cors_origins = os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://localhost:3001,https://ourstore-omega.vercel.app')
     origins_list = [origin.strip() for origin in cors_origins.split(',') if origin.strip()]
@@ -48,6 +54,10 @@ def create_app(config_name=None):
     # Register error handlers
     register_error_handlers(app)
     
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
+    
     # Health check endpoint
     @app.route('/api/health')
     def health_check():
@@ -6,7 +6,7 @@ Models package initialization
 from .category import Category
 from .product import Product  
 from .customer import Customer
-from .order import Order, OrderItem
+from .order import Order, OrderItem, OrderNumber
 from .admin import AdminUser
 from .coupon import Coupon
 from .review import ProductReview
@@ -14,6 +14,11 @@ from .inventory import InventoryLog
 from .newsletter import NewsletterSubscription
 from .settings import SiteSetting
 from .contact import ContactMessage
+from .bestseller import product_bestsellers
+from .reservation import StockReservation
+from .idempotency import IdempotencyKey
+from .job import BackgroundJob, DeadLetterJob
+from .snapshot import StatsSnapshot
 
 __all__ = [
     'Category',
@@ -21,11 +26,17 @@ __all__ = [
     'Customer',
     'Order',
     'OrderItem',
+    'OrderNumber',
     'AdminUser',
     'Coupon',
     'ProductReview',
     'InventoryLog',
     'NewsletterSubscription',
     'SiteSetting',
-    'ContactMessage'
+    'ContactMessage',
+    'StockReservation',
+    'IdempotencyKey',
+    'BackgroundJob',
+    'DeadLetterJob',
+    'StatsSnapshot'
 ]
\ No newline at end of file
@@ -3,6 +3,7 @@ Base model class with common functionality
 """
 
 from datetime import datetime
+from sqlalchemy.orm import declared_attr
 from app.core.database import db
 
 class BaseModel(db.Model):
@@ -31,4 +32,23 @@ class BaseModel(db.Model):
             setattr(self, key, value)
         self.updated_at = datetime.utcnow()
         db.session.commit()
-        return self
\ No newline at end of file
+        return self
+
+
+class PartitionedModel(BaseModel):
+    """Base class for tables range-partitioned by month on created_at
+
+    PostgreSQL requires the partition key in the primary key, so the table
+    key is (id, created_at). Ids still come from a single sequence, so id
+    alone stays the ORM identity and Model.query.get(id) keeps working.
+    Partitions are managed by app.core.partitions.
+    """
+
+    __abstract__ = True
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    created_at = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow)
+
+    @declared_attr.directive
+    def __mapper_args__(cls):
+        return {'primary_key': [cls.__table__.c.id]}
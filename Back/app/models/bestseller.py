@@ -0,0 +1,68 @@
+"""
+Bestseller ranking materialized view
+Units sold per product over a rolling window, precomputed from order_items
+"""
+
+from sqlalchemy import DDL, table, column
+from app.core.database import db
+
+# Sales window in days, read from site_settings when the view is refreshed
+WINDOW_SETTING_KEY = 'bestseller_window_days'
+DEFAULT_WINDOW_DAYS = 30
+
+CREATE_VIEW_SQL = f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS product_bestsellers AS
+SELECT
+    order_items.product_id,
+    products.category_id,
+    SUM(order_items.quantity) AS units_sold,
+    ROW_NUMBER() OVER (
+        ORDER BY SUM(order_items.quantity) DESC, order_items.product_id
+    ) AS overall_rank,
+    ROW_NUMBER() OVER (
+        PARTITION BY products.category_id
+        ORDER BY SUM(order_items.quantity) DESC, order_items.product_id
+    ) AS category_rank
+FROM order_items
+JOIN orders ON orders.id = order_items.order_id
+JOIN products ON products.id = order_items.product_id
+WHERE orders.status <> 'cancelled'
+  AND orders.created_at >= now() - make_interval(days => COALESCE(
+      (SELECT substring(value FROM '^[0-9]+')::int
+       FROM site_settings WHERE key = '{WINDOW_SETTING_KEY}'),
+      {DEFAULT_WINDOW_DAYS}
+  ))
+GROUP BY order_items.product_id, products.category_id
+"""
+
+CREATE_INDEXES_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS ix_product_bestsellers_product_id
+    ON product_bestsellers (product_id);
+CREATE INDEX IF NOT EXISTS ix_product_bestsellers_overall_rank
+    ON product_bestsellers (overall_rank);
+CREATE INDEX IF NOT EXISTS ix_product_bestsellers_category_rank
+    ON product_bestsellers (category_id, category_rank);
+"""
+
+DROP_VIEW_SQL = "DROP MATERIALIZED VIEW IF EXISTS product_bestsellers"
+
+# Lightweight handle for querying the view; it is not part of db.metadata
+# so create_all never tries to create it as a table
+product_bestsellers = table(
+    'product_bestsellers',
+    column('product_id'),
+    column('category_id'),
+    column('units_sold'),
+    column('overall_rank'),
+    column('category_rank')
+)
+
+# Keep db.create_all() / db.drop_all() in step with the migrations
+db.event.listen(db.metadata, 'after_create', DDL(CREATE_VIEW_SQL))
+db.event.listen(db.metadata, 'after_create', DDL(CREATE_INDEXES_SQL))
+db.event.listen(db.metadata, 'before_drop', DDL(DROP_VIEW_SQL))
+
+def refresh_bestsellers():
+    """Recompute the ranking without blocking readers of the view"""
+    db.session.execute(db.text('REFRESH MATERIALIZED VIEW CONCURRENTLY product_bestsellers'))
+    db.session.commit()
@@ -19,6 +19,10 @@ class ContactMessage(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_contact_messages_created_at_id', 'created_at', 'id'),
+    )
+
     def to_dict(self):
         """Convert to dictionary for API responses"""
         return {
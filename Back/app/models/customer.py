@@ -2,8 +2,21 @@
 Customer model
 """
 
+import re
+from datetime import datetime
+from sqlalchemy import DDL, func, cast, update, select, true
+from sqlalchemy.orm import aliased
 from app.core.database import db
 from app.models.base import BaseModel
+from app.models.snapshot import StatsSnapshot
+
+# Searches with fewer digits than this do not look at phone numbers
+MIN_PHONE_SEARCH_DIGITS = 3
+
+def _contains_pattern(text):
+    """LIKE pattern matching text anywhere, with wildcards in text escaped"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
 
 class Customer(BaseModel):
     """Customer model"""
@@ -13,6 +26,8 @@ class Customer(BaseModel):
     name = db.Column(db.String(255), nullable=False)
     email = db.Column(db.String(255), unique=True)
     phone = db.Column(db.String(20))
+    # Digits only, so a search matches however the number was typed
+    phone_digits = db.Column(db.String(20), db.Computed("regexp_replace(coalesce(phone, ''), '\\D', '', 'g')"))
     address = db.Column(db.Text)
     city = db.Column(db.String(100))
     country = db.Column(db.String(100))
@@ -20,6 +35,28 @@ class Customer(BaseModel):
     date_of_birth = db.Column(db.Date)
     is_active = db.Column(db.Boolean, default=True)
     
+    # Order aggregates, kept up to date in the transactions that change
+    # orders. Cancelled orders are not counted; lifetime_value only counts
+    # orders whose payment completed. last_order_at is when the customer
+    # last placed an order.
+    order_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    lifetime_value = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default='0')
+    last_order_at = db.Column(db.DateTime)
+    average_order_value = db.Column(db.Numeric(12, 2), db.Computed(
+        'CASE WHEN order_count > 0 THEN round(lifetime_value / order_count, 2) END'
+    ))
+    
+    __table_args__ = (
+        db.Index('ix_customers_created_at_id', 'created_at', 'id'),
+        # Trigram indexes for substring and similarity search (pg_trgm)
+        db.Index('ix_customers_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_customers_email_trgm', 'email', postgresql_using='gin',
+                 postgresql_ops={'email': 'gin_trgm_ops'}),
+        db.Index('ix_customers_phone_digits_trgm', 'phone_digits', postgresql_using='gin',
+                 postgresql_ops={'phone_digits': 'gin_trgm_ops'}),
+    )
+    
     # Relationships
     orders = db.relationship('Order', backref='customer', lazy=True)
     reviews = db.relationship('ProductReview', backref='customer', lazy=True)
@@ -33,12 +70,151 @@ class Customer(BaseModel):
     @property
     def total_orders(self):
         """Get total number of orders"""
-        return len(self.orders)
+        return self.order_count
     
     @property
     def total_spent(self):
-        """Calculate total amount spent by customer"""
-        return sum(order.total_amount for order in self.orders if order.payment_status == 'completed')
+        """Get total amount spent by customer"""
+        return self.lifetime_value
+    
+    @classmethod
+    def search(cls, text):
+        """Build a match condition and similarity rank for an admin search
+        
+        Matches text anywhere in the name or email, names that are merely
+        similar (typos), and, when text has enough digits, phone numbers
+        containing those digits whatever the punctuation. All of these use
+        the trigram indexes. Returns (None, None) for blank text.
+        """
+        text = text.strip()
+        if not text:
+            return None, None
+        
+        pattern = _contains_pattern(text)
+        conditions = [
+            cls.name.ilike(pattern, escape='\\'),
+            cls.email.ilike(pattern, escape='\\'),
+            cls.name.op('%')(text)
+        ]
+        ranks = [func.similarity(cls.name, text), func.similarity(cls.email, text)]
+        
+        digits = re.sub(r'\D', '', text)
+        if len(digits) >= MIN_PHONE_SEARCH_DIGITS:
+            conditions.append(cls.phone_digits.like(_contains_pattern(digits), escape='\\'))
+            ranks.append(func.similarity(cls.phone_digits, digits))
+        
+        # Rank as double precision so it survives a round trip through a cursor
+        return db.or_(*conditions), cast(func.greatest(*ranks), db.Float)
+    
+    @staticmethod
+    def order_contribution(order):
+        """(orders, value) an order adds to its customer's aggregates"""
+        if order.status == 'cancelled':
+            return 0, 0
+        return 1, order.total_amount if order.payment_status == 'completed' else 0
+    
+    def record_order_change(self, order_count=0, lifetime_value=0, last_order_at=None):
+        """Apply a change in this customer's orders to the aggregates
+        
+        A single UPDATE adds the deltas in the database, so concurrent
+        checkouts for the same customer cannot lose each other's counts.
+        The caller commits.
+        """
+        values = {
+            'order_count': Customer.order_count + order_count,
+            'lifetime_value': Customer.lifetime_value + lifetime_value
+        }
+        if last_order_at is not None:
+            values['last_order_at'] = func.greatest(Customer.last_order_at, last_order_at)
+        db.session.execute(
+            update(Customer.__table__).where(Customer.id == self.id).values(**values)
+        )
+        # Reload the new totals (and the computed average) on next access
+        db.session.expire(self, ['order_count', 'lifetime_value', 'last_order_at', 'average_order_value'])
+    
+    @classmethod
+    def remove_orders(cls, order_ids):
+        """Take cancelled orders out of their customers' aggregates with one UPDATE"""
+        from app.models.order import Order
+        
+        removed = select(
+            Order.customer_id,
+            func.count().label('order_count'),
+            func.coalesce(func.sum(Order.total_amount).filter(Order.payment_status == 'completed'), 0)
+                .label('lifetime_value')
+        ).where(Order.id.in_(order_ids), Order.customer_id.isnot(None))\
+         .group_by(Order.customer_id).subquery()
+        
+        db.session.execute(
+            update(cls.__table__).where(cls.id == removed.c.customer_id).values(
+                order_count=cls.order_count - removed.c.order_count,
+                lifetime_value=cls.lifetime_value - removed.c.lifetime_value
+            )
+        )
+    
+    @classmethod
+    def overview_stats(cls, top=5):
+        """Customer counts and top spenders from a single query
+        
+        The counts come from one pass over customers (a CTE with FILTER
+        aggregates) and the top spenders are joined onto that one row; the
+        stored aggregates mean no order rows are read.
+        """
+        this_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        totals = select(
+            func.count().label('total_customers'),
+            func.count().filter(cls.order_count > 0).label('customers_with_orders'),
+            func.count().filter(cls.created_at >= this_month).label('new_customers_this_month')
+        ).cte('customer_totals')
+        top_spenders = select(cls).where(cls.lifetime_value > 0)\
+            .order_by(cls.lifetime_value.desc(), cls.id).limit(top).subquery('top_spenders')
+        top_customer = aliased(cls, top_spenders)
+        
+        rows = db.session.query(totals, top_customer).select_from(totals)\
+            .outerjoin(top_customer, true())\
+            .order_by(top_spenders.c.lifetime_value.desc(), top_spenders.c.id).all()
+        
+        total_customers, customers_with_orders, new_customers_this_month, _ = rows[0]
+        return {
+            'total_customers': total_customers,
+            'customers_with_orders': customers_with_orders,
+            'new_customers_this_month': new_customers_this_month,
+            'top_customers': [
+                {
+                    'customer': customer.to_dict(),
+                    'total_spent': float(customer.lifetime_value)
+                }
+                for *_, customer in rows if customer is not None
+            ]
+        }
+    
+    @classmethod
+    def refresh_aggregates(cls):
+        """Recompute every customer's aggregates from the orders table
+        
+        For repairs and bulk loads that bypass the API; the caller commits.
+        """
+        from app.models.order import Order
+        
+        live = Order.status != 'cancelled'
+        totals = select(
+            Order.customer_id,
+            func.count().filter(live).label('order_count'),
+            func.coalesce(func.sum(Order.total_amount).filter(live, Order.payment_status == 'completed'), 0)
+                .label('lifetime_value'),
+            func.max(Order.created_at).label('last_order_at')
+        ).where(Order.customer_id.isnot(None)).group_by(Order.customer_id).subquery()
+        
+        db.session.execute(
+            update(cls.__table__).values(order_count=0, lifetime_value=0, last_order_at=None)
+        )
+        db.session.execute(
+            update(cls.__table__).where(cls.id == totals.c.customer_id).values(
+                order_count=totals.c.order_count,
+                lifetime_value=totals.c.lifetime_value,
+                last_order_at=totals.c.last_order_at
+            )
+        )
     
     def to_dict(self):
         """Convert to dictionary representation"""
@@ -54,10 +230,17 @@ class Customer(BaseModel):
             'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
             'is_active': self.is_active,
             'full_address': self.full_address,
-            'total_orders': self.total_orders,
-            'total_spent': str(self.total_spent),
+            'total_orders': self.order_count,
+            'total_spent': str(self.lifetime_value),
+            'average_order_value': str(self.average_order_value) if self.average_order_value is not None else None,
+            'last_order_date': self.last_order_at.isoformat() if self.last_order_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
     def __repr__(self):
-        return f'<Customer {self.name}>'
\ No newline at end of file
+        return f'<Customer {self.name}>'
+
+StatsSnapshot.register('customers.stats', Customer.overview_stats)
+
+# The trigram indexes need pg_trgm; keep db.create_all() in step with the migrations
+db.event.listen(db.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
@@ -0,0 +1,36 @@
+"""
+Idempotency key model
+Remembers the response to a POST so a retried request can be answered with it
+"""
+
+from datetime import datetime
+from app.core.database import db
+
+class IdempotencyKey(db.Model):
+    """Idempotency-Key claimed by a request and, once finished, its response"""
+
+    __tablename__ = 'idempotency_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(100), nullable=False)  # method and path, e.g. "POST /api/orders"
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='processing')  # processing, completed
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_idempotency_keys_scope_key'),
+    )
+
+    @classmethod
+    def delete_expired(cls):
+        """Delete every expired key in one statement; returns the number deleted"""
+        deleted = cls.query.filter(cls.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.scope} {self.key}: {self.status}>'
@@ -3,15 +3,16 @@ Inventory log model
 """
 
 from app.core.database import db
-from app.models.base import BaseModel
+from app.core.partitions import default_partition_ddl
+from app.models.base import PartitionedModel
 
-class InventoryLog(BaseModel):
+class InventoryLog(PartitionedModel):
     """Inventory log model for tracking stock changes"""
     
     __tablename__ = "inventory_logs"
     
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
-    change_type = db.Column(db.String(20), nullable=False)  # stock_in, stock_out, adjustment, sale, return
+    change_type = db.Column(db.String(20), nullable=False)  # stock_in, stock_out, adjustment, sale, return, reserve, release
     quantity_change = db.Column(db.Integer, nullable=False)
     previous_stock = db.Column(db.Integer, nullable=False)
     new_stock = db.Column(db.Integer, nullable=False)
@@ -19,6 +20,8 @@ class InventoryLog(BaseModel):
     reference_id = db.Column(db.Integer)  # Can link to order_id or other reference
     created_by = db.Column(db.String(100))  # Admin user who made the change
     
+    __table_args__ = {'postgresql_partition_by': 'RANGE (created_at)'}
+    
     def to_dict(self):
         """Convert to dictionary representation"""
         return {
@@ -35,4 +38,6 @@ class InventoryLog(BaseModel):
         }
     
     def __repr__(self):
-        return f'<InventoryLog {self.id}: {self.change_type} {self.quantity_change}>'
\ No newline at end of file
+        return f'<InventoryLog {self.id}: {self.change_type} {self.quantity_change}>'
+
+db.event.listen(InventoryLog.__table__, 'after_create', default_partition_ddl('inventory_logs'))
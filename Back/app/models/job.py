@@ -0,0 +1,63 @@
+"""
+Background job models
+Queue table for the database job backend and the dead-letter table for jobs
+that ran out of attempts on any backend
+"""
+
+from datetime import datetime
+from app.core.database import db
+
+class BackgroundJob(db.Model):
+    """Job waiting to run (or running) on the database backend
+
+    Rows are written in the same transaction as the change that caused
+    them, so a job exists if and only if that change was committed.
+    """
+
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    dedupe_key = db.Column(db.String(200))  # at most one queued job per key
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_background_jobs_status_run_at', 'status', 'run_at'),
+        db.Index('uq_background_jobs_queued_dedupe_key', 'dedupe_key', unique=True,
+                 postgresql_where=db.text("status = 'queued'")),
+    )
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.id}: {self.name} ({self.status})>'
+
+class DeadLetterJob(db.Model):
+    """Job that failed on every attempt, kept for inspection and replay"""
+
+    __tablename__ = 'dead_letter_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    attempts = db.Column(db.Integer, nullable=False)
+    last_error = db.Column(db.Text)
+    failed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert to dictionary representation"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'payload': self.payload,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'failed_at': self.failed_at.isoformat() if self.failed_at else None
+        }
+
+    def __repr__(self):
+        return f'<DeadLetterJob {self.id}: {self.name}>'
@@ -4,16 +4,19 @@ Order and OrderItem models
 
 import uuid
 from datetime import datetime
+from sqlalchemy import func, update, select
+from sqlalchemy.orm import joinedload, selectinload
 from app.core.database import db
-from app.models.base import BaseModel
+from app.core.partitions import default_partition_ddl
+from app.models.base import PartitionedModel
 
-class Order(BaseModel):
+class Order(PartitionedModel):
     """Order model"""
     
     __tablename__ = "orders"
     
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=True)
-    order_number = db.Column(db.String(50), unique=True, nullable=False)
+    order_number = db.Column(db.String(50), nullable=False)
     status = db.Column(db.String(20), default='pending')
     subtotal = db.Column(db.Numeric(10, 2), nullable=False)
     tax_amount = db.Column(db.Numeric(10, 2), default=0)
@@ -25,14 +28,63 @@ class Order(BaseModel):
     shipping_address = db.Column(db.JSON)
     billing_address = db.Column(db.JSON)
     notes = db.Column(db.Text)
+    tracking_number = db.Column(db.String(100))
+    shipped_at = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    
+    STATUSES = ('pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled')
+    PAYMENT_STATUSES = ('pending', 'completed', 'failed', 'refunded')
+    
+    # Bulk status changes: target status -> statuses an order may move from
+    BULK_TRANSITIONS = {
+        'processing': ('pending', 'confirmed'),
+        'shipped': ('pending', 'confirmed', 'processing'),
+        'delivered': ('pending', 'confirmed', 'processing', 'shipped'),
+        'cancelled': ('pending', 'confirmed', 'processing')
+    }
+    
+    # Columns of export_rows(): order-level, then per line item
+    EXPORT_COLUMNS = (
+        'order_id', 'order_number', 'created_at', 'status', 'payment_status', 'payment_method',
+        'customer_id', 'customer_name', 'customer_email', 'subtotal', 'tax_amount',
+        'shipping_cost', 'total_amount', 'currency', 'tracking_number', 'shipped_at', 'delivered_at'
+    )
+    EXPORT_ITEM_COLUMNS = ('product_id', 'product_name', 'quantity', 'color', 'size', 'price', 'line_total')
+    
+    __table_args__ = (
+        db.Index('ix_orders_created_at_id', 'created_at', 'id'),
+        # Date-range statistics; total_amount is included for index-only scans
+        db.Index('ix_orders_created_at_status', 'created_at', 'status', postgresql_include=['total_amount']),
+        # A unique constraint on a partitioned table must include the partition key,
+        # so this only indexes order_number; OrderNumber keeps it globally unique
+        db.UniqueConstraint('order_number', 'created_at', name='uq_orders_order_number'),
+        {'postgresql_partition_by': 'RANGE (created_at)'}
+    )
+    
+    # Serialized fields that are not read from a column of the same name
+    FIELD_COLUMNS = {
+        'customer': ('customer_id',),
+        'item_count': (),
+        'items': ()
+    }
     
     # Relationships
-    order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
+    # order_items.order_id has no foreign key: orders.id alone is not unique
+    # to PostgreSQL once orders is partitioned, and a key on (id, created_at)
+    # would need the item to carry its order's created_at. The database no
+    # longer rejects items of a missing order or deletes them with it; the
+    # ORM cascade below does the latter, and orders are never deleted by
+    # the application.
+    order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan',
+                                  primaryjoin='Order.id == foreign(OrderItem.order_id)')
+    number_entry = db.relationship('OrderNumber', uselist=False, lazy=True, cascade='all, delete-orphan',
+                                   primaryjoin='Order.id == foreign(OrderNumber.order_id)')
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not self.order_number:
             self.order_number = self.generate_order_number()
+        self.number_entry = OrderNumber(order_number=self.order_number)
     
     def generate_order_number(self):
         """Generate a unique order number"""
@@ -56,25 +108,215 @@ class Order(BaseModel):
         """Get total number of items in order"""
         return sum(item.quantity for item in self.order_items)
     
-    def to_dict(self):
-        """Convert to dictionary representation"""
+    def to_dict(self, fields=None):
+        """Convert to dictionary representation
+        
+        fields limits the output to the given keys (see ORDER_FIELDS); the
+        customer and items relationships are only loaded when requested.
+        Load lists with relationship_options(fields) to avoid per-order queries.
+        """
+        return {field: ORDER_FIELDS[field](self) for field in (fields or ORDER_FIELDS)}
+    
+    @classmethod
+    def bulk_update_status(cls, status, conditions):
+        """Move every order matching conditions to status in one UPDATE
+        
+        Only orders whose current status allows the move (BULK_TRANSITIONS)
+        change, so repeating a request is harmless. Shipping and delivery
+        are stamped on shipped_at/delivered_at. Cancelled orders are
+        restocked with one UPDATE that adds each product's total quantity,
+        logged as one 'return' per product, and taken out of their
+        customers' aggregates. Returns (order_ids, restocked)
+        with restocked as {product_id: units}. Does not commit.
+        """
+        from app.models.product import Product
+        from app.models.inventory import InventoryLog
+        
+        now = datetime.utcnow()
+        values = {'status': status, 'updated_at': now}
+        if status in ('shipped', 'delivered'):
+            values['shipped_at'] = func.coalesce(cls.shipped_at, now)
+        if status == 'delivered':
+            values['delivered_at'] = now
+        
+        order_ids = db.session.execute(
+            update(cls.__table__)
+            .where(cls.status.in_(cls.BULK_TRANSITIONS[status]), *conditions)
+            .values(**values)
+            .returning(cls.id)
+        ).scalars().all()
+        
+        restocked = {}
+        if status == 'cancelled' and order_ids:
+            from app.models.customer import Customer
+            Customer.remove_orders(order_ids)
+            
+            quantities = select(OrderItem.product_id, func.sum(OrderItem.quantity).label('quantity'))\
+                .where(OrderItem.order_id.in_(order_ids))\
+                .group_by(OrderItem.product_id).subquery()
+            rows = db.session.execute(
+                update(Product.__table__)
+                .where(Product.id == quantities.c.product_id)
+                .values(stock=Product.stock + quantities.c.quantity)
+                .returning(Product.id, Product.stock, quantities.c.quantity)
+            ).all()
+            
+            if rows:
+                db.session.execute(db.insert(InventoryLog), [
+                    {
+                        'product_id': product_id,
+                        'change_type': 'return',
+                        'quantity_change': quantity,
+                        'previous_stock': stock - quantity,
+                        'new_stock': stock,
+                        'reason': f'Cancellation of {len(order_ids)} order(s)',
+                        'reference_id': order_ids[0] if len(order_ids) == 1 else None
+                    }
+                    for product_id, stock, quantity in rows
+                ])
+            restocked = {product_id: quantity for product_id, _, quantity in rows}
+        
+        return order_ids, restocked
+    
+    @classmethod
+    def stats_by_status(cls, start=None, end=None, since=None):
+        """Order count and revenue per status from a single scan of orders
+        
+        start and end (exclusive) limit the orders considered. since adds
+        the count and revenue of orders created from that moment on, taken
+        with FILTER in the same pass. Every status in the table is
+        reported; those in STATUSES are always present. Returns
+        {status: {'count', 'revenue', 'count_since', 'revenue_since'}}.
+        """
+        columns = [cls.status, func.count(), func.coalesce(func.sum(cls.total_amount), 0)]
+        if since is not None:
+            recent = cls.created_at >= since
+            columns += [
+                func.count().filter(recent),
+                func.coalesce(func.sum(cls.total_amount).filter(recent), 0)
+            ]
+        
+        query = db.session.query(*columns)
+        if start is not None:
+            query = query.filter(cls.created_at >= start)
+        if end is not None:
+            query = query.filter(cls.created_at < end)
+        
+        stats = {status: {'count': 0, 'revenue': 0, 'count_since': 0, 'revenue_since': 0}
+                 for status in cls.STATUSES}
+        for status, count, revenue, *recent in query.group_by(cls.status):
+            count_since, revenue_since = recent or (0, 0)
+            stats[status] = {
+                'count': count,
+                'revenue': revenue,
+                'count_since': count_since,
+                'revenue_since': revenue_since
+            }
+        return stats
+    
+    @classmethod
+    def export_rows(cls, start=None, end=None, status=None, chunk_size=1000):
+        """Flat rows for the order export, one per order line
+        
+        Orders, their customer and their items come from a single joined
+        query read through a server-side cursor, chunk_size rows at a time,
+        so memory stays flat however many orders match. Rows are ordered by
+        order, so the lines of an order are adjacent; an order without
+        items yields one row with empty item columns.
+        """
+        from app.models.customer import Customer
+        from app.models.product import Product
+        
+        query = select(
+            cls.id.label('order_id'), cls.order_number, cls.created_at, cls.status,
+            cls.payment_status, cls.payment_method, cls.customer_id,
+            Customer.name.label('customer_name'), Customer.email.label('customer_email'),
+            cls.subtotal, cls.tax_amount, cls.shipping_cost, cls.total_amount, cls.currency,
+            cls.tracking_number, cls.shipped_at, cls.delivered_at,
+            OrderItem.product_id, Product.name.label('product_name'), OrderItem.quantity,
+            OrderItem.color, OrderItem.size, OrderItem.price, OrderItem.total.label('line_total')
+        )
+        
+        # An item's created_at never precedes its order's (see
+        # _item_not_before_order), so the start bound also prunes
+        # order_items partitions without losing lines
+        item_join = OrderItem.order_id == cls.id
+        if start is not None:
+            item_join &= OrderItem.created_at >= start
+        query = query.select_from(cls)\
+            .outerjoin(Customer, Customer.id == cls.customer_id)\
+            .outerjoin(OrderItem, item_join)\
+            .outerjoin(Product, Product.id == OrderItem.product_id)
+        
+        if start is not None:
+            query = query.where(cls.created_at >= start)
+        if end is not None:
+            query = query.where(cls.created_at < end)
+        if status:
+            query = query.where(cls.status == status)
+        query = query.order_by(cls.created_at, cls.id, OrderItem.id)
+        
+        # yield_per turns on stream_results: psycopg2 uses a named cursor
+        return db.session.execute(query, execution_options={'yield_per': chunk_size}).mappings()
+    
+    @classmethod
+    def summary_options(cls):
+        """Loader options for to_summary_dict(): a page of orders costs a
+        fixed number of queries however many items and orders there are
+        """
+        from app.models.customer import Customer
+        from app.models.product import Product
+        
+        return [
+            joinedload(cls.customer).load_only(Customer.name, Customer.email, Customer.phone),
+            selectinload(cls.order_items).joinedload(OrderItem.product).load_only(Product.name, Product.image_url)
+        ]
+    
+    @classmethod
+    def relationship_options(cls, fields):
+        """Loader options for to_dict(fields): eager-load only the
+        relationships the requested fields read, so a page of orders costs a
+        fixed number of queries
+        """
+        from app.models.product import Product
+        
+        options = []
+        if 'customer' in fields:
+            options.append(joinedload(cls.customer))
+        if 'items' in fields:
+            options.append(selectinload(cls.order_items).joinedload(OrderItem.product)
+                           .load_only(Product.name, Product.image_url))
+        elif 'item_count' in fields:
+            options.append(selectinload(cls.order_items).load_only(OrderItem.quantity))
+        return options
+    
+    def to_summary_dict(self):
+        """Compact representation for order lists
+        
+        Embeds only the customer's contact details and a short form of each
+        item, never the customer's order history or full products. Load the
+        orders with summary_options() to avoid per-order queries.
+        """
         return {
             'id': self.id,
-            'customer': self.customer.to_dict() if self.customer else None,
             'order_number': self.order_number,
             'status': self.status,
-            'subtotal': str(self.subtotal),
-            'tax_amount': str(self.tax_amount),
-            'shipping_cost': str(self.shipping_cost),
-            'total_amount': str(self.total_amount),
-            'currency': self.currency,
             'payment_status': self.payment_status,
             'payment_method': self.payment_method,
-            'shipping_address': self.shipping_address,
-            'billing_address': self.billing_address,
-            'notes': self.notes,
+            'currency': self.currency,
+            'subtotal': str(self.subtotal),
+            'total_amount': str(self.total_amount),
+            'tracking_number': self.tracking_number,
+            'shipped_at': self.shipped_at.isoformat() if self.shipped_at else None,
+            'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None,
+            'customer': {
+                'id': self.customer.id,
+                'name': self.customer.name,
+                'email': self.customer.email,
+                'phone': self.customer.phone
+            } if self.customer else None,
             'item_count': self.item_count,
-            'items': [item.to_dict() for item in self.order_items],
+            'items': [item.to_summary_dict() for item in self.order_items],
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -82,12 +324,60 @@ class Order(BaseModel):
     def __repr__(self):
         return f'<Order {self.order_number}>'
 
-class OrderItem(BaseModel):
-    """Order item model"""
+# Serialized order fields in output order; each reads only what it needs
+ORDER_FIELDS = {
+    'id': lambda order: order.id,
+    'customer': lambda order: order.customer.to_dict() if order.customer else None,
+    'order_number': lambda order: order.order_number,
+    'status': lambda order: order.status,
+    'subtotal': lambda order: str(order.subtotal),
+    'tax_amount': lambda order: str(order.tax_amount),
+    'shipping_cost': lambda order: str(order.shipping_cost),
+    'total_amount': lambda order: str(order.total_amount),
+    'currency': lambda order: order.currency,
+    'payment_status': lambda order: order.payment_status,
+    'payment_method': lambda order: order.payment_method,
+    'shipping_address': lambda order: order.shipping_address,
+    'billing_address': lambda order: order.billing_address,
+    'notes': lambda order: order.notes,
+    'tracking_number': lambda order: order.tracking_number,
+    'shipped_at': lambda order: order.shipped_at.isoformat() if order.shipped_at else None,
+    'delivered_at': lambda order: order.delivered_at.isoformat() if order.delivered_at else None,
+    'item_count': lambda order: order.item_count,
+    'items': lambda order: [item.to_summary_dict() for item in order.order_items],
+    'created_at': lambda order: order.created_at.isoformat() if order.created_at else None,
+    'updated_at': lambda order: order.updated_at.isoformat() if order.updated_at else None
+}
+
+class OrderNumber(db.Model):
+    """Registry of order numbers
+    
+    orders is partitioned, so its unique constraint has to include
+    created_at and cannot stop two orders sharing a number. This
+    unpartitioned table keeps order_number globally unique: Order adds its
+    row in the same flush, so a duplicate number fails the whole insert.
+    """
+    
+    __tablename__ = 'order_numbers'
+    
+    order_number = db.Column(db.String(50), primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<OrderNumber {self.order_number}>'
+
+class OrderItem(PartitionedModel):
+    """Order item model
+    
+    Order.export_rows() prunes order_items partitions with the orders'
+    start date, which holds only while an item's created_at is never
+    earlier than its order's; items inserted with their order are stamped
+    no earlier than it.
+    """
     
     __tablename__ = "order_items"
     
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     color = db.Column(db.String(50))
@@ -95,6 +385,11 @@ class OrderItem(BaseModel):
     price = db.Column(db.Numeric(10, 2), nullable=False)  # Price at time of order
     total = db.Column(db.Numeric(10, 2), nullable=False)  # quantity * price
     
+    __table_args__ = (
+        db.Index('ix_order_items_order_id', 'order_id'),
+        {'postgresql_partition_by': 'RANGE (created_at)'}
+    )
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if self.quantity and self.price and not self.total:
@@ -122,5 +417,34 @@ class OrderItem(BaseModel):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
+    def to_summary_dict(self):
+        """Compact representation used inside Order.to_summary_dict()"""
+        return {
+            'id': self.id,
+            'product': {
+                'id': self.product.id,
+                'name': self.product.name,
+                'image_url': self.product.image_url
+            } if self.product else None,
+            'quantity': self.quantity,
+            'color': self.color,
+            'size': self.size,
+            'price': str(self.price),
+            'total': str(self.total)
+        }
+    
     def __repr__(self):
-        return f'<OrderItem {self.id}: {self.quantity}x Product {self.product_id}>'
\ No newline at end of file
+        return f'<OrderItem {self.id}: {self.quantity}x Product {self.product_id}>'
+
+db.event.listen(Order.__table__, 'after_create', default_partition_ddl('orders'))
+db.event.listen(OrderItem.__table__, 'after_create', default_partition_ddl('order_items'))
+
+# export_rows() relies on an item never being older than its order; the
+# order's created_at is already set here, as orders are inserted first
+
+@db.event.listens_for(OrderItem, 'before_insert')
+def _item_not_before_order(mapper, connection, item):
+    order = item.__dict__.get('order')
+    if order is not None and order.created_at and (
+            item.created_at is None or item.created_at < order.created_at):
+        item.created_at = order.created_at
@@ -2,9 +2,27 @@
 Product model
 """
 
+import re
+from sqlalchemy import func, cast, select, update, values, column, literal, literal_column, true
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR, aggregate_order_by
+from sqlalchemy.orm.attributes import set_committed_value
 from app.core.database import db
 from app.models.base import BaseModel
 
+# Storefront locale -> PostgreSQL text search configuration
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'fr': 'french',
+    'ar': 'arabic'
+}
+
+def _search_vector_sql(config):
+    """Generated column expression: name weighted above description"""
+    return (
+        f"setweight(to_tsvector('{config}', coalesce(name, '')), 'A') || "
+        f"setweight(to_tsvector('{config}', coalesce(description, '')), 'B')"
+    )
+
 class Product(BaseModel):
     """Product model"""
     
@@ -15,8 +33,8 @@ class Product(BaseModel):
     price = db.Column(db.Numeric(10, 2), nullable=False)
     original_price = db.Column(db.Numeric(10, 2))
     stock = db.Column(db.Integer, nullable=False, default=0)
-    color_options = db.Column(db.ARRAY(db.String), nullable=True)
-    size_options = db.Column(db.ARRAY(db.String), nullable=True)
+    color_options = db.Column(ARRAY(db.String), nullable=True)
+    size_options = db.Column(ARRAY(db.String), nullable=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
     is_bestseller = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
@@ -26,6 +44,33 @@ class Product(BaseModel):
     weight = db.Column(db.Numeric(8, 2))
     dimensions = db.Column(db.JSON)  # Store as JSON: {"length": 10, "width": 5, "height": 2}
     
+    # Denormalized review totals, maintained by the ProductReview flush hooks
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Full-text search vectors, one per storefront language (see SEARCH_CONFIGS);
+    # deferred so that loading a product never pulls them
+    search_vector_en = db.deferred(db.Column(TSVECTOR, db.Computed(_search_vector_sql('english'), persisted=True)))
+    search_vector_fr = db.deferred(db.Column(TSVECTOR, db.Computed(_search_vector_sql('french'), persisted=True)))
+    search_vector_ar = db.deferred(db.Column(TSVECTOR, db.Computed(_search_vector_sql('arabic'), persisted=True)))
+    
+    __table_args__ = (
+        db.Index('ix_products_created_at_id', 'created_at', 'id'),
+        db.Index('ix_products_category_created_at', 'category_id', 'created_at', 'id'),
+        db.Index('ix_products_search_vector_en', 'search_vector_en', postgresql_using='gin'),
+        db.Index('ix_products_search_vector_fr', 'search_vector_fr', postgresql_using='gin'),
+        db.Index('ix_products_search_vector_ar', 'search_vector_ar', postgresql_using='gin'),
+        db.Index('ix_products_color_options', 'color_options', postgresql_using='gin'),
+        db.Index('ix_products_size_options', 'size_options', postgresql_using='gin'),
+    )
+    
+    # Serialized fields that are not read from a column of the same name
+    FIELD_COLUMNS = {
+        'category': ('category_id',),
+        'average_rating': ('rating_sum', 'rating_count'),
+        'review_count': ('rating_count',)
+    }
+    
     # Relationships
     order_items = db.relationship('OrderItem', backref='product', lazy=True)
     reviews = db.relationship('ProductReview', backref='product', lazy=True)
@@ -33,20 +78,117 @@ class Product(BaseModel):
     
     @property
     def average_rating(self):
-        """Calculate average rating from reviews"""
-        if not self.reviews:
+        """Get average rating from the stored review totals"""
+        if not self.rating_count:
             return 0
-        return sum(review.rating for review in self.reviews) / len(self.reviews)
+        return self.rating_sum / self.rating_count
     
     @property
     def review_count(self):
         """Get total number of reviews"""
-        return len(self.reviews)
+        return self.rating_count or 0
+    
+    @classmethod
+    def search(cls, text, lang='en'):
+        """Build a full-text match condition and rank for the given locale
+        
+        Every word is matched as a prefix so results update while the
+        customer is still typing. Returns (None, None) if the text has no
+        searchable words.
+        """
+        words = re.findall(r'\w+', text)
+        if not words:
+            return None, None
+        
+        if lang not in SEARCH_CONFIGS:
+            lang = 'en'
+        vector = getattr(cls, f'search_vector_{lang}')
+        query = func.to_tsquery(SEARCH_CONFIGS[lang], ' & '.join(f'{word}:*' for word in words))
+        # Rank as double precision so it survives a round trip through a cursor
+        return vector.op('@@')(query), cast(func.ts_rank(vector, query), db.Float)
+    
+    @classmethod
+    def facet_counts(cls, query, price_boundaries):
+        """Build a scalar JSON expression counting the products matched by query
+        
+        The filtered rows are gathered once in a CTE and grouped by category,
+        price bucket, color, size and availability, so the counts can ride
+        along as an extra column of the page query. Price buckets are
+        width_bucket() numbers over price_boundaries: 0 is below the first
+        boundary, len(price_boundaries) is at or above the last.
+        """
+        from app.models.category import Category
+        
+        filtered = query.order_by(None).with_entities(
+            cls.category_id, cls.price, cls.stock, cls.color_options, cls.size_options
+        ).cte('filtered_products')
+        
+        def counts_json(value, *extra):
+            """JSON array of {value, count} rows, most common first"""
+            return func.coalesce(
+                func.json_agg(aggregate_order_by(
+                    func.json_build_object('value', value.c.value, *extra, 'count', value.c.count),
+                    value.c.count.desc(), value.c.value
+                )),
+                literal_column("'[]'::json")
+            )
+        
+        categories = select(
+            filtered.c.category_id.label('value'), Category.name.label('name'), func.count().label('count')
+        ).select_from(filtered).outerjoin(Category, Category.id == filtered.c.category_id)\
+         .group_by(filtered.c.category_id, Category.name).subquery()
+        
+        price_bucket = func.width_bucket(filtered.c.price, literal(price_boundaries, ARRAY(db.Numeric)))
+        prices = select(price_bucket.label('value'), func.count().label('count'))\
+            .group_by(price_bucket).subquery()
+        
+        def array_counts(array_column):
+            values = func.unnest(array_column).table_valued('value').render_derived()
+            return select(values.c.value, func.count().label('count'))\
+                .select_from(filtered).join(values, true())\
+                .group_by(values.c.value).subquery()
+        colors = array_counts(filtered.c.color_options)
+        sizes = array_counts(filtered.c.size_options)
+        
+        availability = select(func.json_build_object(
+            'in_stock', func.count().filter(filtered.c.stock > 0),
+            'out_of_stock', func.count().filter(filtered.c.stock <= 0)
+        )).scalar_subquery()
+        
+        return select(func.json_build_object(
+            'categories', select(counts_json(categories, 'name', categories.c.name)).scalar_subquery(),
+            'price', select(counts_json(prices)).scalar_subquery(),
+            'colors', select(counts_json(colors)).scalar_subquery(),
+            'sizes', select(counts_json(sizes)).scalar_subquery(),
+            'availability', availability
+        )).scalar_subquery()
     
     def is_in_stock(self):
         """Check if product is in stock"""
         return self.stock > 0
     
+    @classmethod
+    def decrement_stock(cls, quantities):
+        """Take stock for {product_id: quantity} in one guarded UPDATE
+        
+        Each row is only decremented while it still has enough stock, so
+        concurrent checkouts can never drive stock negative. Returns
+        {product_id: new_stock} for the rows that were updated; a product
+        missing from the result did not have enough stock. Runs in the
+        current transaction and does not commit.
+        """
+        requested = values(
+            column('product_id', db.Integer), column('quantity', db.Integer), name='requested'
+        ).data(list(quantities.items()))
+        
+        rows = db.session.execute(
+            update(cls.__table__)
+            .where(cls.id == requested.c.product_id, cls.stock >= requested.c.quantity)
+            .values(stock=cls.stock - requested.c.quantity)
+            .returning(cls.id, cls.stock)
+        )
+        return dict(rows.all())
+    
     def update_stock(self, quantity_change, reason=None):
         """Update product stock and log the change"""
         from app.models.inventory import InventoryLog
@@ -67,30 +209,65 @@ class Product(BaseModel):
         
         return self.save()
     
-    def to_dict(self):
-        """Convert to dictionary representation"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'price': str(self.price),
-            'original_price': str(self.original_price) if self.original_price else None,
-            'stock': self.stock,
-            'color_options': self.color_options or [],
-            'size_options': self.size_options or [],
-            'category': self.category.name if self.category else None,
-            'is_bestseller': self.is_bestseller,
-            'is_active': self.is_active,
-            'image_url': self.image_url,
-            'images': self.images or [],
-            'sku': self.sku,
-            'weight': str(self.weight) if self.weight else None,
-            'dimensions': self.dimensions,
-            'average_rating': self.average_rating,
-            'review_count': self.review_count,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    def to_dict(self, fields=None):
+        """Convert to dictionary representation
+        
+        fields limits the output to the given keys (see PRODUCT_FIELDS); the other
+        values are never read, so columns left unloaded stay unloaded.
+        """
+        return {field: PRODUCT_FIELDS[field](self) for field in (fields or PRODUCT_FIELDS)}
+    
+    @classmethod
+    def to_dict_list(cls, products, fields=None):
+        """Serialize a list of products with a batched category lookup"""
+        from app.models.category import Category
+        
+        products = list(products)
+        
+        # Load the page's categories with one query and attach each to its
+        # products, so product.category never lazy-loads one per product
+        if fields is None or 'category' in fields:
+            category_ids = {product.category_id for product in products if product.category_id}
+            categories = {}
+            if category_ids:
+                categories = {category.id: category
+                              for category in Category.query.filter(Category.id.in_(category_ids))}
+            for product in products:
+                if 'category' not in product.__dict__:
+                    set_committed_value(product, 'category', categories.get(product.category_id))
+        
+        return [product.to_dict(fields) for product in products]
     
     def __repr__(self):
-        return f'<Product {self.name}>'
\ No newline at end of file
+        return f'<Product {self.name}>'
+
+# Serialized product fields in output order; each reads only what it needs
+PRODUCT_FIELDS = {
+    'id': lambda product: product.id,
+    'name': lambda product: product.name,
+    'description': lambda product: product.description,
+    'price': lambda product: str(product.price),
+    'original_price': lambda product: str(product.original_price) if product.original_price else None,
+    'stock': lambda product: product.stock,
+    'color_options': lambda product: product.color_options or [],
+    'size_options': lambda product: product.size_options or [],
+    'category': lambda product: product.category.name if product.category else None,
+    'is_bestseller': lambda product: product.is_bestseller,
+    'is_active': lambda product: product.is_active,
+    'image_url': lambda product: product.image_url,
+    'images': lambda product: product.images or [],
+    'sku': lambda product: product.sku,
+    'weight': lambda product: str(product.weight) if product.weight else None,
+    'dimensions': lambda product: product.dimensions,
+    'average_rating': lambda product: product.average_rating,
+    'review_count': lambda product: product.review_count,
+    'created_at': lambda product: product.created_at.isoformat() if product.created_at else None,
+    'updated_at': lambda product: product.updated_at.isoformat() if product.updated_at else None
+}
+
+# Average rating as a SQL expression, shared by "sort by rating" and its index
+average_rating_expression = func.coalesce(
+    cast(Product.rating_sum, db.Float) / func.nullif(Product.rating_count, 0, type_=db.Float), 0
+)
+
+db.Index('ix_products_average_rating', average_rating_expression)
@@ -0,0 +1,165 @@
+"""
+Stock reservation model
+Time-limited holds on stock, taken when a customer enters checkout
+"""
+
+import uuid
+from datetime import datetime
+from sqlalchemy import delete, update, select, func, or_
+from app.core.database import db
+from app.models.base import BaseModel
+from app.models.product import Product
+from app.models.inventory import InventoryLog
+
+class StockReservation(BaseModel):
+    """Hold on units of a product; the units are taken out of stock while it lasts
+
+    One checkout's lines share a token. A hold ends by being converted into
+    an order (the units stay sold), released, or swept once it expires (the
+    units go back to stock). Taking and returning the units are logged as
+    'reserve' and 'release' inventory changes.
+    """
+
+    __tablename__ = "stock_reservations"
+
+    token = db.Column(db.String(36), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    color = db.Column(db.String(50))
+    size = db.Column(db.String(50))
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    product = db.relationship('Product', lazy='joined')
+
+    @classmethod
+    def hold(cls, items, ttl, customer_id=None):
+        """Take stock for items and record the holds under a new token
+
+        items is a list of {product_id, quantity, color, size}. Stock is
+        taken with Product.decrement_stock(), so a hold can never oversell.
+        Returns (reservations, short_product_ids); nothing is held when
+        short_product_ids is not empty. Does not commit.
+        """
+        quantities = {}
+        for item in items:
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+
+        # Same lock order as checkout, so holds and orders never deadlock
+        db.session.query(Product.id).filter(Product.id.in_(quantities))\
+                  .order_by(Product.id).with_for_update().all()
+
+        new_stock = Product.decrement_stock(quantities)
+        short = [product_id for product_id in quantities if product_id not in new_stock]
+        if short:
+            return [], short
+
+        token = str(uuid.uuid4())
+        cls._log_stock_changes('reserve', {
+            product_id: (-quantity, new_stock[product_id])
+            for product_id, quantity in quantities.items()
+        }, f'Checkout hold {token}')
+        
+        expires_at = datetime.utcnow() + ttl
+        reservations = [
+            cls(
+                token=token,
+                product_id=item['product_id'],
+                customer_id=customer_id,
+                quantity=item['quantity'],
+                color=item.get('color'),
+                size=item.get('size'),
+                expires_at=expires_at
+            )
+            for item in items
+        ]
+        db.session.add_all(reservations)
+        db.session.flush()
+        return reservations, []
+
+    @classmethod
+    def convert(cls, token, customer_id):
+        """Consume a live hold of customer_id for checkout and return its lines
+
+        The rows are deleted in one statement, so a hold can only be
+        converted once and never after the sweeper has released it. The
+        held units are already out of stock (and logged). Holds taken for
+        another customer are left alone. Returns an empty list if the token
+        is unknown, expired or not the customer's. Does not commit.
+        """
+        rows = db.session.execute(
+            delete(cls.__table__)
+            .where(cls.token == token, cls.expires_at > datetime.utcnow(),
+                   or_(cls.customer_id == customer_id, cls.customer_id.is_(None)))
+            .returning(cls.product_id, cls.quantity, cls.color, cls.size)
+        )
+        return [row._asdict() for row in rows]
+
+    @classmethod
+    def release(cls, token):
+        """Give a hold's units back to stock; returns {product_id: units}"""
+        return cls._release(cls.token == token, f'Released checkout hold {token}')
+
+    @classmethod
+    def sweep_expired(cls):
+        """Release every expired hold in one statement; returns {product_id: units}"""
+        return cls._release(cls.expires_at <= datetime.utcnow(), 'Expired checkout hold')
+
+    @classmethod
+    def _release(cls, condition, reason):
+        """Delete matching holds and add their units back to stock, set-based
+
+        A single UPDATE ... FROM (DELETE ... RETURNING) restores all
+        products at once instead of one update per hold, and each product's
+        return is logged. Returns {product_id: units} so callers can
+        invalidate those products. Does not commit.
+        """
+        released = delete(cls.__table__).where(condition)\
+            .returning(cls.product_id, cls.quantity).cte('released')
+        totals = select(released.c.product_id, func.sum(released.c.quantity).label('quantity'))\
+            .group_by(released.c.product_id).subquery()
+
+        rows = db.session.execute(
+            update(Product.__table__)
+            .where(Product.id == totals.c.product_id)
+            .values(stock=Product.stock + totals.c.quantity)
+            .returning(Product.id, totals.c.quantity, Product.stock)
+        ).all()
+        cls._log_stock_changes('release', {
+            product_id: (quantity, stock) for product_id, quantity, stock in rows
+        }, reason)
+        return {product_id: quantity for product_id, quantity, _ in rows}
+
+    @staticmethod
+    def _log_stock_changes(change_type, changes, reason):
+        """Log {product_id: (quantity_change, new_stock)} with one multi-row insert"""
+        if not changes:
+            return
+        db.session.execute(db.insert(InventoryLog), [
+            {
+                'product_id': product_id,
+                'change_type': change_type,
+                'quantity_change': quantity_change,
+                'previous_stock': new_stock - quantity_change,
+                'new_stock': new_stock,
+                'reason': reason
+            }
+            for product_id, (quantity_change, new_stock) in changes.items()
+        ])
+
+    def to_dict(self):
+        """Convert to dictionary representation"""
+        return {
+            'id': self.id,
+            'token': self.token,
+            'product_id': self.product_id,
+            'product_name': self.product.name if self.product else None,
+            'quantity': self.quantity,
+            'color': self.color,
+            'size': self.size,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<StockReservation {self.token}: {self.quantity}x Product {self.product_id}>'
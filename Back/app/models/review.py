@@ -2,8 +2,10 @@
 Product review model
 """
 
+from sqlalchemy import inspect
 from app.core.database import db
 from app.models.base import BaseModel
+from app.models.product import Product
 
 class ProductReview(BaseModel):
     """Product review model"""
@@ -33,4 +35,50 @@ class ProductReview(BaseModel):
         }
     
     def __repr__(self):
-        return f'<ProductReview {self.id}: {self.rating} stars>'
\ No newline at end of file
+        return f'<ProductReview {self.id}: {self.rating} stars>'
+
+def _adjust_product_rating(connection, product_id, rating_change, count_change):
+    """Apply a review change to the product's stored rating totals"""
+    products = Product.__table__
+    connection.execute(
+        products.update()
+        .where(products.c.id == product_id)
+        .values(
+            rating_sum=products.c.rating_sum + rating_change,
+            rating_count=products.c.rating_count + count_change
+        )
+    )
+
+# The totals cover every review (approved or not), matching what
+# average_rating has always reported. They are written on the flush's own
+# connection so they commit or roll back together with the review.
+
+@db.event.listens_for(ProductReview, 'after_insert')
+def _review_inserted(mapper, connection, review):
+    _adjust_product_rating(connection, review.product_id, review.rating, 1)
+
+@db.event.listens_for(ProductReview, 'after_update')
+def _review_updated(mapper, connection, review):
+    state = inspect(review)
+    product_history = state.attrs.product_id.history
+    rating_history = state.attrs.rating.history
+    if not product_history.has_changes() and not rating_history.has_changes():
+        return
+    
+    old_product_id = product_history.deleted[0] if product_history.deleted else review.product_id
+    old_rating = rating_history.deleted[0] if rating_history.deleted else review.rating
+    
+    if old_product_id == review.product_id:
+        _adjust_product_rating(connection, review.product_id, review.rating - old_rating, 0)
+    else:
+        _adjust_product_rating(connection, old_product_id, -old_rating, -1)
+        _adjust_product_rating(connection, review.product_id, review.rating, 1)
+
+@db.event.listens_for(ProductReview, 'after_delete')
+def _review_deleted(mapper, connection, review):
+    state = inspect(review)
+    rating_history = state.attrs.rating.history
+    product_history = state.attrs.product_id.history
+    rating = rating_history.deleted[0] if rating_history.deleted else review.rating
+    product_id = product_history.deleted[0] if product_history.deleted else review.product_id
+    _adjust_product_rating(connection, product_id, -rating, -1)
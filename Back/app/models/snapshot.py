@@ -0,0 +1,72 @@
+"""
+Stats snapshot model
+Precomputed statistics for admin pages, served from one row and refreshed
+in the background once stale
+"""
+
+import json
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert
+from app.core.database import db
+
+class StatsSnapshot(db.Model):
+    """Latest computed value of a registered statistic"""
+
+    __tablename__ = 'stats_snapshots'
+
+    key = db.Column(db.String(100), primary_key=True)
+    data = db.Column(db.JSON, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+    # key -> function returning the JSON-serializable statistics
+    builders = {}
+
+    @classmethod
+    def register(cls, key, build):
+        cls.builders[key] = build
+
+    @classmethod
+    def refresh(cls, key):
+        """Recompute and store the snapshot for key; the caller commits"""
+        # Store exactly what jsonify would send (Decimals, dates and so on)
+        data = json.loads(current_app.json.dumps(cls.builders[key]()))
+        now = datetime.utcnow()
+        db.session.execute(
+            insert(cls).values(key=key, data=data, computed_at=now)
+            .on_conflict_do_update(index_elements=['key'], set_={'data': data, 'computed_at': now})
+        )
+        return db.session.get(cls, key, populate_existing=True)
+
+    @classmethod
+    def fetch(cls, key, ttl, max_age):
+        """Return the snapshot for key without recomputing it if possible
+
+        A snapshot older than ttl seconds is still served, and a background
+        refresh is queued. Only a missing snapshot, or one older than
+        max_age seconds (no worker has refreshed it), is recomputed inline.
+        """
+        snapshot = db.session.get(cls, key)
+        now = datetime.utcnow()
+
+        if snapshot is None or snapshot.computed_at < now - timedelta(seconds=max_age):
+            snapshot = cls.refresh(key)
+            db.session.commit()
+        elif snapshot.computed_at < now - timedelta(seconds=ttl):
+            cls.queue_refresh(key)
+            db.session.commit()
+        return snapshot
+
+    @classmethod
+    def queue_refresh(cls, key, delay=0):
+        """Queue a background refresh of key unless one is already waiting
+
+        Call it when the underlying data changes; with a delay, a burst of
+        changes shares one recompute. The caller commits.
+        """
+        from app.core.jobs import enqueue
+
+        enqueue('stats.refresh_snapshot', {'key': key}, delay=delay, dedupe_key=f'stats.refresh_snapshot:{key}')
+
+    def __repr__(self):
+        return f'<StatsSnapshot {self.key} at {self.computed_at}>'
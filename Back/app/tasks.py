@@ -0,0 +1,143 @@
+"""
+Background jobs run by worker.py
+Post-checkout side effects that do not need to delay the response, and
+periodic maintenance
+"""
+
+import logging
+import smtplib
+from email.message import EmailMessage
+from flask import current_app
+from app.core.cache import cache, product_tag, BESTSELLERS_TAG
+from app.core.jobs import job, enqueue, after_commit
+from app.core.partitions import ensure_partitions
+from app.models.order import Order
+from app.models.inventory import InventoryLog
+from app.models.snapshot import StatsSnapshot
+from app.models.reservation import StockReservation
+
+logger = logging.getLogger(__name__)
+
+# Bestseller rollups are batched: orders placed within this many seconds
+# share one refresh
+BESTSELLERS_REFRESH_DELAY = 60
+
+# The admin dashboard snapshot is refreshed this many seconds after an
+# order or stock change, so a burst of changes shares one recompute
+DASHBOARD_SNAPSHOT = 'admin.dashboard'
+DASHBOARD_REFRESH_DELAY = 10
+
+# Partition maintenance reschedules itself this often; worker.py queues
+# the first run
+PARTITION_CHECK_INTERVAL = 24 * 60 * 60
+
+# Expired checkout holds are swept this often (seconds); worker.py queues
+# the first run
+RESERVATION_SWEEP_INTERVAL = 60
+
+def order_placed(order, product_ids):
+    """Queue the side effects of a new order; call before the checkout commits"""
+    enqueue('orders.enrich_inventory_logs', {'order_id': order.id})
+    enqueue('orders.send_confirmation', {'order_id': order.id})
+    enqueue('catalog.refresh_bestsellers', delay=BESTSELLERS_REFRESH_DELAY,
+            dedupe_key='catalog.refresh_bestsellers')
+    dashboard_changed()
+
+    tags = [product_tag(product_id) for product_id in product_ids]
+    if cache.is_shared:
+        enqueue('cache.invalidate', {'tags': tags})
+    else:
+        # An in-process cache can only be cleared by the process holding it
+        after_commit(lambda: cache.invalidate(*tags))
+
+def dashboard_changed():
+    """Queue a refresh of the dashboard snapshot; call before the change commits"""
+    StatsSnapshot.queue_refresh(DASHBOARD_SNAPSHOT, delay=DASHBOARD_REFRESH_DELAY)
+
+@job('orders.enrich_inventory_logs')
+def enrich_inventory_logs(order_id):
+    """Attach order and customer context to the sale logs written at checkout"""
+    order = Order.query.get(order_id)
+    if order is None:
+        return
+
+    customer = order.customer.name if order.customer else 'guest'
+    InventoryLog.query.filter_by(reference_id=order.id, change_type='sale').update({
+        'reason': f'Order {order.order_number} for {customer}',
+        'created_by': 'checkout'
+    }, synchronize_session=False)
+
+@job('orders.send_confirmation', max_attempts=8)
+def send_order_confirmation(order_id):
+    """Email the customer a summary of their order"""
+    order = Order.query.get(order_id)
+    if order is None or not order.customer or not order.customer.email:
+        return
+
+    config = current_app.config
+    if not config.get('MAIL_SERVER'):
+        logger.info('MAIL_SERVER not set, skipping confirmation for %s', order.order_number)
+        return
+
+    lines = [f'Hello {order.customer.name},', '', f'Thank you for your order {order.order_number}.', '']
+    for item in order.order_items:
+        name = item.product.name if item.product else f'Product {item.product_id}'
+        lines.append(f'{item.quantity} x {name}: {item.total} {order.currency}')
+    lines += ['', f'Total: {order.total_amount} {order.currency}']
+
+    message = EmailMessage()
+    message['Subject'] = f'Order confirmation {order.order_number}'
+    message['From'] = config.get('MAIL_USERNAME')
+    message['To'] = order.customer.email
+    message.set_content('\n'.join(lines))
+
+    with smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=10) as smtp:
+        if config.get('MAIL_USE_TLS'):
+            smtp.starttls()
+        if config.get('MAIL_USERNAME'):
+            smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        smtp.send_message(message)
+
+@job('catalog.refresh_bestsellers')
+def refresh_bestsellers_job():
+    """Roll recent sales into the bestseller ranking"""
+    from app.models.bestseller import refresh_bestsellers
+
+    refresh_bestsellers()
+    cache.invalidate(BESTSELLERS_TAG)
+
+@job('cache.invalidate')
+def invalidate_cache(tags):
+    """Drop cached responses for the given tags"""
+    cache.invalidate(*tags)
+
+@job('stats.refresh_snapshot')
+def refresh_stats_snapshot(key):
+    """Recompute a stats snapshot that a reader found stale"""
+    StatsSnapshot.refresh(key)
+
+def schedule_partition_maintenance(delay=0):
+    """Queue the partition check unless one is already waiting"""
+    enqueue('maintenance.create_partitions', delay=delay, dedupe_key='maintenance.create_partitions')
+
+@job('maintenance.create_partitions')
+def create_partitions_job():
+    """Create upcoming monthly partitions, then schedule the next check"""
+    created = ensure_partitions(current_app.config['PARTITION_MONTHS_AHEAD'])
+    if created:
+        logger.info('Created partitions: %s', ', '.join(created))
+    schedule_partition_maintenance(delay=PARTITION_CHECK_INTERVAL)
+
+def schedule_reservation_sweep(delay=0):
+    """Queue the sweep of expired checkout holds unless one is already waiting"""
+    enqueue('reservations.sweep', delay=delay, dedupe_key='reservations.sweep')
+
+@job('reservations.sweep')
+def sweep_reservations_job():
+    """Return the stock of expired checkout holds, then schedule the next sweep"""
+    released = StockReservation.sweep_expired()
+    if released:
+        logger.info('Released %s reserved units', sum(released.values()))
+        tags = [product_tag(product_id) for product_id in released]
+        after_commit(lambda: cache.invalidate(*tags))
+    schedule_reservation_sweep(delay=RESERVATION_SWEEP_INTERVAL)
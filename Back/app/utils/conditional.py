@@ -0,0 +1,51 @@
+"""
+Conditional GET utilities
+ETag / Last-Modified validators and 304 Not Modified responses
+"""
+
+import hashlib
+from collections import namedtuple
+from datetime import timezone
+from flask import request, make_response
+
+Validators = namedtuple('Validators', ['etag', 'last_modified', 'version'])
+
+def make_validators(*state, last_modified=None):
+    """Build validators from the values a response body depends on
+
+    state should hold cheap summaries of the data (ids, counts, max
+    updated_at); the request path and query string are mixed in so each
+    variant of an endpoint gets its own ETag. version digests state alone:
+    put it in the cache key of a cached body so the body served under an
+    ETag is always one built for that state.
+
+    Only pass last_modified for a single resource. A list's newest
+    updated_at does not move when a row leaves it, so If-Modified-Since
+    would answer 304 for a changed list; lists rely on the ETag alone.
+    """
+    digest = hashlib.sha1(repr((request.full_path,) + state).encode()).hexdigest()
+    version = hashlib.sha1(repr(state).encode()).hexdigest()[:16]
+    if last_modified is not None:
+        # Stored timestamps are naive UTC
+        last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    return Validators(digest, last_modified, version)
+
+def not_modified(validators):
+    """Return a 304 response if the client's copy is still current, else None"""
+    if request.if_none_match:
+        is_current = request.if_none_match.contains(validators.etag)
+    elif request.if_modified_since and validators.last_modified:
+        is_current = validators.last_modified <= request.if_modified_since
+    else:
+        is_current = False
+
+    if not is_current:
+        return None
+    return with_validators(make_response('', 304), validators)
+
+def with_validators(response, validators):
+    """Attach ETag and Last-Modified headers to a response"""
+    response.set_etag(validators.etag)
+    if validators.last_modified is not None:
+        response.last_modified = validators.last_modified
+    return response
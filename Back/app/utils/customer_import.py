@@ -0,0 +1,239 @@
+"""
+Bulk customer import
+Streams CSV or NDJSON customer lists into a staging table with COPY and
+merges them into customers with a single INSERT ... ON CONFLICT (email)
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import text
+from app.core.database import db
+from app.models.customer import Customer
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Importable customer fields; name and email are required
+IMPORT_COLUMNS = ('name', 'email', 'phone', 'address', 'city', 'country', 'postal_code',
+                  'date_of_birth', 'is_active')
+
+# Rejected lines listed in the report; the count covers all of them
+MAX_REPORTED_ERRORS = 100
+
+TRUE_VALUES = {'true', 't', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'f', 'no', 'n', '0'}
+
+CREATE_STAGING_SQL = """
+CREATE TEMPORARY TABLE customer_import (
+    line integer NOT NULL,
+    name text NOT NULL,
+    email text NOT NULL,
+    phone text,
+    address text,
+    city text,
+    country text,
+    postal_code text,
+    date_of_birth date,
+    is_active boolean
+) ON COMMIT DROP
+"""
+
+COPY_SQL = f"COPY customer_import (line, {', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# The last line for an email wins; fields missing from the file keep
+# their current value (is_active is resolved against the existing row up
+# front, since it cannot be NULL). xmax = 0 only for rows the INSERT created.
+MERGE_SQL = """
+WITH ranked AS (
+    SELECT customer_import.*,
+           row_number() OVER (PARTITION BY email ORDER BY line DESC) AS position
+    FROM customer_import
+),
+merged AS (
+    INSERT INTO customers (name, email, phone, address, city, country, postal_code,
+                           date_of_birth, is_active, created_at, updated_at)
+    SELECT ranked.name, ranked.email, ranked.phone, ranked.address, ranked.city,
+           ranked.country, ranked.postal_code, ranked.date_of_birth,
+           COALESCE(ranked.is_active, existing.is_active, true), :now, :now
+    FROM ranked
+    LEFT JOIN customers AS existing ON existing.email = ranked.email
+    WHERE ranked.position = 1
+    ON CONFLICT (email) DO UPDATE SET
+        name = EXCLUDED.name,
+        phone = COALESCE(EXCLUDED.phone, customers.phone),
+        address = COALESCE(EXCLUDED.address, customers.address),
+        city = COALESCE(EXCLUDED.city, customers.city),
+        country = COALESCE(EXCLUDED.country, customers.country),
+        postal_code = COALESCE(EXCLUDED.postal_code, customers.postal_code),
+        date_of_birth = COALESCE(EXCLUDED.date_of_birth, customers.date_of_birth),
+        is_active = EXCLUDED.is_active,
+        updated_at = EXCLUDED.updated_at
+    RETURNING xmax = 0 AS inserted
+)
+SELECT count(*) FILTER (WHERE inserted),
+       count(*) FILTER (WHERE NOT inserted),
+       (SELECT count(*) FROM ranked WHERE position > 1)
+FROM merged
+"""
+
+DUPLICATES_SQL = """
+SELECT line, email
+FROM (
+    SELECT line, email, row_number() OVER (PARTITION BY email ORDER BY line DESC) AS position
+    FROM customer_import
+) AS ranked
+WHERE position > 1
+ORDER BY line
+LIMIT :limit
+"""
+
+class InvalidImport(ValueError):
+    """Raised when a file cannot be imported at all (as opposed to a bad line)"""
+
+class _CopyFeed:
+    """File-like reader over an iterator of strings, as COPY expects"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    readline = read
+
+def _records(stream, import_format):
+    """Iterate (line number, record, error) over the file
+
+    The CSV header is checked before anything is read into the database.
+    """
+    if import_format == 'csv':
+        reader = csv.DictReader(stream)
+        missing = {'name', 'email'} - set(reader.fieldnames or ())
+        if missing:
+            raise InvalidImport(f"CSV header is missing: {', '.join(sorted(missing))}")
+        return ((reader.line_num, record, None) for record in reader)
+    return _ndjson_records(stream)
+
+def _ndjson_records(stream):
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'Expected a JSON object'
+            continue
+        yield line_number, record, None
+
+def _clean(record):
+    """Validate one record and return its IMPORT_COLUMNS values; raises ValueError"""
+    values = {}
+    for column in IMPORT_COLUMNS:
+        value = record.get(column)
+        if isinstance(value, str):
+            value = value.strip() or None
+        values[column] = value
+
+    if not values['name']:
+        raise ValueError('name is required')
+    if not values['email'] or '@' not in str(values['email']):
+        raise ValueError('a valid email is required')
+
+    for column in IMPORT_COLUMNS:
+        value = values[column]
+        if value is None or column in ('date_of_birth', 'is_active'):
+            continue
+        value = values[column] = str(value)
+        length = Customer.__table__.c[column].type.length
+        if length and len(value) > length:
+            raise ValueError(f'{column} is longer than {length} characters')
+
+    if values['date_of_birth'] is not None:
+        try:
+            values['date_of_birth'] = date.fromisoformat(str(values['date_of_birth'])).isoformat()
+        except ValueError:
+            raise ValueError('date_of_birth must be an ISO date, e.g. 1990-01-31')
+
+    is_active = values['is_active']
+    if is_active is not None and not isinstance(is_active, bool):
+        if str(is_active).lower() in TRUE_VALUES:
+            is_active = True
+        elif str(is_active).lower() in FALSE_VALUES:
+            is_active = False
+        else:
+            raise ValueError('is_active must be true or false')
+    values['is_active'] = None if is_active is None else ('true' if is_active else 'false')
+
+    return [values[column] for column in IMPORT_COLUMNS]
+
+def import_customers(stream, import_format):
+    """Import customers from a text stream and commit
+
+    Lines are validated while they stream into a temporary staging table
+    with COPY, then merged into customers by one INSERT ... ON CONFLICT
+    (email) DO UPDATE, so the whole file costs a handful of statements and
+    a single commit. Returns {'inserted', 'updated', 'rejected', 'errors'};
+    errors lists up to MAX_REPORTED_ERRORS rejected lines.
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise InvalidImport(f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+
+    records = _records(stream, import_format)
+    errors = []
+    rejected = 0
+
+    def staged_lines():
+        nonlocal rejected
+        output = io.StringIO()
+        writer = csv.writer(output)
+        for line, record, error in records:
+            if error is None:
+                try:
+                    row = _clean(record)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line, 'error': error})
+                continue
+            writer.writerow([line] + row)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+
+    try:
+        # COPY goes through the session's own connection and transaction
+        cursor = db.session.connection().connection.cursor()
+        cursor.execute(CREATE_STAGING_SQL)
+        cursor.copy_expert(COPY_SQL, _CopyFeed(staged_lines()))
+
+        inserted, updated, duplicates = db.session.execute(
+            text(MERGE_SQL), {'now': datetime.utcnow()}
+        ).one()
+        if duplicates:
+            rejected += duplicates
+            for line, email in db.session.execute(
+                    text(DUPLICATES_SQL), {'limit': MAX_REPORTED_ERRORS - len(errors)}):
+                errors.append({'line': line, 'error': f'{email} appears again later in the file'})
+            errors.sort(key=lambda error: error['line'])
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {'inserted': inserted, 'updated': updated, 'rejected': rejected, 'errors': errors}
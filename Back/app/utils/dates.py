@@ -0,0 +1,14 @@
+"""
+Date parameter parsing shared by the API endpoints
+"""
+
+from datetime import datetime, timedelta
+
+def parse_date(value, end_of_day=False):
+    """Parse an ISO date or datetime query parameter; a bare end date covers the whole day"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
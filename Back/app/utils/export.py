@@ -0,0 +1,76 @@
+"""
+Streaming export utilities
+Turn row iterators into CSV or NDJSON chunks for a streamed response
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+# Flush to the client once this much output is buffered
+CHUNK_BYTES = 64 * 1024
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    return _json_value(value)
+
+def _chunked(lines):
+    """Join small lines into chunks of about CHUNK_BYTES"""
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def csv_stream(rows, columns):
+    """CSV with a header line, one line per row"""
+    def lines():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([_csv_value(row[column]) for column in columns])
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        yield output.getvalue()
+    return _chunked(lines())
+
+def ndjson_stream(rows, key, columns, child_key, child_columns):
+    """One JSON object per group of adjacent rows sharing key
+
+    columns are taken from the first row of the group, child_columns from
+    every row and listed under child_key; rows where child_columns are all
+    empty (an outer join with no match) add no child.
+    """
+    def lines():
+        for _, group in groupby(rows, key=lambda row: row[key]):
+            group = list(group)
+            record = {column: _json_value(group[0][column]) for column in columns}
+            record[child_key] = [
+                {column: _json_value(row[column]) for column in child_columns}
+                for row in group
+                if any(row[column] is not None for column in child_columns)
+            ]
+            yield json.dumps(record) + '\n'
+    return _chunked(lines())
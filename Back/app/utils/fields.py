@@ -0,0 +1,39 @@
+"""
+Field projection utilities
+Parse a fields= query parameter and load only the columns it needs
+"""
+
+from sqlalchemy.orm import load_only
+
+class InvalidFields(ValueError):
+    """Raised when fields= names a field the resource does not have"""
+
+def parse_fields(value, allowed):
+    """Return the requested fields in output order, or None for all of them"""
+    if not value:
+        return None
+
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [field for field in allowed if field in requested]
+
+def load_fields(model, fields, field_columns=None):
+    """Build a load_only() option covering the columns behind fields
+
+    field_columns maps serialized fields that are not plain columns to the
+    column names they read (possibly none); other fields are assumed to be
+    columns of the same name. The primary key is always loaded.
+    """
+    field_columns = field_columns or {}
+    names = {'id'}
+    for field in fields:
+        names.update(field_columns.get(field, (field,)))
+    return load_only(*(getattr(model, name) for name in sorted(names)))
+
+def project(data, fields):
+    """Trim an already serialized dict down to the requested fields"""
+    if fields is None:
+        return data
+    return {field: data[field] for field in fields}
@@ -0,0 +1,144 @@
+"""
+Idempotency-Key support for POST endpoints
+A retried request with the same key gets the stored response instead of
+running the endpoint again
+"""
+
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, make_response, current_app, g
+from sqlalchemy import or_, and_
+from sqlalchemy.dialects.postgresql import insert
+from app.core.database import db
+from app.models.idempotency import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+
+def _request_hash():
+    """Hash the request body; JSON is canonicalized so key order does not matter"""
+    body = request.get_json(silent=True)
+    payload = json.dumps(body, sort_keys=True) if body is not None else request.get_data(as_text=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _claim(scope, key, request_hash):
+    """Try to become the request that runs the endpoint for this key
+
+    The INSERT ... ON CONFLICT claims a new key atomically, and also takes
+    over a key that has expired or whose request stalled without finishing.
+    Returns True if this request holds the claim.
+    """
+    now = datetime.utcnow()
+    stalled_before = now - timedelta(seconds=current_app.config['IDEMPOTENCY_PROCESSING_TIMEOUT'])
+    fresh = {
+        'request_hash': request_hash,
+        'status': 'processing',
+        'response_status': None,
+        'response_body': None,
+        'created_at': now,
+        'expires_at': now + timedelta(hours=current_app.config['IDEMPOTENCY_KEY_TTL_HOURS'])
+    }
+    statement = insert(IdempotencyKey).values(scope=scope, key=key, **fresh)
+    statement = statement.on_conflict_do_update(
+        constraint='uq_idempotency_keys_scope_key',
+        set_=fresh,
+        where=or_(
+            IdempotencyKey.expires_at <= now,
+            and_(IdempotencyKey.status == 'processing', IdempotencyKey.created_at < stalled_before)
+        )
+    ).returning(IdempotencyKey.id)
+
+    claimed = db.session.execute(statement).scalar() is not None
+    # Commit right away so concurrent requests see the claim
+    db.session.commit()
+    return claimed
+
+def _replay(record):
+    """Rebuild the stored response"""
+    response = make_response(record.response_body, record.response_status)
+    response.mimetype = 'application/json'
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def store_response(response):
+    """Record response for the request's Idempotency-Key in the current transaction
+
+    Endpoints that commit changes call this just before their commit, so
+    the changes and the stored response are saved together: a crash after
+    the commit can never leave the key 'processing' for a retry to take
+    over and run the endpoint a second time. Does nothing for requests
+    without a key.
+    """
+    claim = g.get('idempotency_claim')
+    if claim is None:
+        return
+    scope, key = claim
+    IdempotencyKey.query.filter_by(scope=scope, key=key).update({
+        'status': 'completed',
+        'response_status': response.status_code,
+        'response_body': response.get_data(as_text=True)
+    })
+    g.idempotency_stored = True
+
+def _finish(scope, key, response):
+    """Store or give up the key once the endpoint has returned, and commit"""
+    if response.status_code >= 500:
+        # Let the client retry a failure instead of replaying it
+        db.session.rollback()
+        IdempotencyKey.query.filter_by(scope=scope, key=key).delete()
+    elif not g.pop('idempotency_stored', False):
+        # Nothing was committed by the endpoint (e.g. a 400); store it now
+        store_response(response)
+    db.session.commit()
+
+def idempotent(view):
+    """Make a POST endpoint safe to retry with an Idempotency-Key header
+
+    Requests without the header run as usual. The first request with a key
+    runs the endpoint and stores its response; later requests with the same
+    key and body get that response back, and requests that arrive while it
+    is still running wait for it. Reusing a key with a different body is
+    rejected. Server errors are not stored, so the client can retry them.
+    Endpoints that commit must call store_response() before committing.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        scope = f'{request.method} {request.path}'
+        request_hash = _request_hash()
+        deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT_SECONDS']
+
+        while not _claim(scope, key, request_hash):
+            record = IdempotencyKey.query.filter_by(scope=scope, key=key).first()
+            db.session.rollback()  # end the read so the next poll sees new commits
+
+            if record is None:
+                continue  # the first request failed and gave the key up; claim it
+            if record.request_hash != request_hash:
+                return jsonify({'error': 'Idempotency-Key was already used with a different request'}), 422
+            if record.status == 'completed':
+                return _replay(record)
+            if time.monotonic() >= deadline:
+                return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409
+            time.sleep(0.1)
+
+        g.idempotency_claim = (scope, key)
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(scope=scope, key=key).delete()
+            db.session.commit()
+            raise
+
+        _finish(scope, key, response)
+        return response
+
+    return wrapper
@@ -0,0 +1,91 @@
+"""
+Keyset (cursor) pagination utilities
+Seeks on (sort key, id) instead of OFFSET so every page costs the same
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import tuple_
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or belongs to another ordering"""
+
+def _encode_value(value):
+    """Tag values that JSON cannot represent exactly"""
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+def _decode_value(value):
+    """Inverse of _encode_value; anything it could not have produced is rejected"""
+    if isinstance(value, dict):
+        try:
+            if 'dt' in value:
+                return datetime.fromisoformat(value['dt'])
+            if 'dec' in value:
+                return Decimal(value['dec'])
+        except (ValueError, TypeError, ArithmeticError):
+            raise InvalidCursor('Malformed cursor')
+        raise InvalidCursor('Unknown cursor value')
+    if value is None or isinstance(value, str) or _is_number(value):
+        return value
+    raise InvalidCursor('Malformed cursor')
+
+def _is_number(value):
+    # bool is an int subclass but never a sort key or an id
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def encode_cursor(ordering, sort_value, row_id):
+    """Build an opaque cursor pointing just after the given row"""
+    payload = json.dumps({'o': ordering, 'k': [_encode_value(sort_value), row_id]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, ordering):
+    """Return (sort_value, row_id) from a cursor made for the same ordering"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value, row_id = payload['k']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise InvalidCursor('Malformed cursor')
+
+    if payload.get('o') != ordering:
+        raise InvalidCursor('Cursor does not match the requested ordering')
+    return _decode_value(sort_value), row_id
+
+def keyset_paginate(query, sort_column, id_column, cursor, per_page, descending=True, ordering='created_at'):
+    """Fetch the page that follows cursor, ordered by (sort_column, id_column)
+
+    An empty cursor returns the first page. Rows inserted while a client is
+    paging never shift later pages because the seek is on the row's own
+    key, not its position. Returns (items, next_cursor); next_cursor is
+    None on the last page.
+    """
+    ordering = f"{ordering}:{'desc' if descending else 'asc'}"
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, ordering)
+        key = tuple_(sort_column, id_column)
+        bound = tuple_(sort_value, row_id)
+        query = query.filter(key < bound if descending else key > bound)
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    rows = query.add_columns(sort_column, id_column).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        _, sort_value, row_id = rows[-1]
+        next_cursor = encode_cursor(ordering, sort_value, row_id)
+
+    return [row[0] for row in rows], next_cursor
@@ -0,0 +1,31 @@
+"""Add order_numbers table
+
+Revision ID: a2f6d9c3e815
+Revises: f8c4a2e6b937
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a2f6d9c3e815'
+down_revision = 'f8c4a2e6b937'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # uq_orders_order_number includes created_at since orders is partitioned;
+    # this unpartitioned table keeps order numbers unique across partitions
+    op.create_table(
+        'order_numbers',
+        sa.Column('order_number', sa.String(length=50), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('order_number')
+    )
+    op.execute('INSERT INTO order_numbers (order_number, order_id) SELECT order_number, id FROM orders')
+
+
+def downgrade():
+    op.drop_table('order_numbers')
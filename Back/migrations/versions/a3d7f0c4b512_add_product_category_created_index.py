@@ -0,0 +1,23 @@
+"""Add (category_id, created_at, id) index for featured products
+
+Revision ID: a3d7f0c4b512
+Revises: f1b5c8d2e403
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a3d7f0c4b512'
+down_revision = 'f1b5c8d2e403'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_products_category_created_at', 'products', ['category_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_products_category_created_at', table_name='products')
@@ -0,0 +1,51 @@
+"""Add background_jobs and dead_letter_jobs tables
+
+Revision ID: a7e5c1f9d284
+Revises: f6b3d8c2a957
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7e5c1f9d284'
+down_revision = 'f6b3d8c2a957'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('background_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('dedupe_key', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_background_jobs_status_run_at', 'background_jobs', ['status', 'run_at'])
+    op.create_index('uq_background_jobs_queued_dedupe_key', 'background_jobs', ['dedupe_key'],
+                    unique=True, postgresql_where=sa.text("status = 'queued'"))
+
+    op.create_table('dead_letter_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('failed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('dead_letter_jobs')
+    op.drop_index('uq_background_jobs_queued_dedupe_key', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_status_run_at', table_name='background_jobs')
+    op.drop_table('background_jobs')
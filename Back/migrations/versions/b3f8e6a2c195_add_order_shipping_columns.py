@@ -0,0 +1,27 @@
+"""Add tracking_number, shipped_at and delivered_at to orders
+
+Revision ID: b3f8e6a2c195
+Revises: a7e5c1f9d284
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b3f8e6a2c195'
+down_revision = 'a7e5c1f9d284'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('orders', sa.Column('tracking_number', sa.String(length=100), nullable=True))
+    op.add_column('orders', sa.Column('shipped_at', sa.DateTime(), nullable=True))
+    op.add_column('orders', sa.Column('delivered_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('orders', 'delivered_at')
+    op.drop_column('orders', 'shipped_at')
+    op.drop_column('orders', 'tracking_number')
@@ -0,0 +1,50 @@
+"""Add product_bestsellers materialized view
+
+Revision ID: b8e2a9d4c671
+Revises: a3d7f0c4b512
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2a9d4c671'
+down_revision = 'a3d7f0c4b512'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE MATERIALIZED VIEW product_bestsellers AS
+        SELECT
+            order_items.product_id,
+            products.category_id,
+            SUM(order_items.quantity) AS units_sold,
+            ROW_NUMBER() OVER (
+                ORDER BY SUM(order_items.quantity) DESC, order_items.product_id
+            ) AS overall_rank,
+            ROW_NUMBER() OVER (
+                PARTITION BY products.category_id
+                ORDER BY SUM(order_items.quantity) DESC, order_items.product_id
+            ) AS category_rank
+        FROM order_items
+        JOIN orders ON orders.id = order_items.order_id
+        JOIN products ON products.id = order_items.product_id
+        WHERE orders.status <> 'cancelled'
+          AND orders.created_at >= now() - make_interval(days => COALESCE(
+              (SELECT substring(value FROM '^[0-9]+')::int
+               FROM site_settings WHERE key = 'bestseller_window_days'),
+              30
+          ))
+        GROUP BY order_items.product_id, products.category_id
+    """)
+    # A unique index is required for REFRESH ... CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX ix_product_bestsellers_product_id ON product_bestsellers (product_id)")
+    op.execute("CREATE INDEX ix_product_bestsellers_overall_rank ON product_bestsellers (overall_rank)")
+    op.execute("CREATE INDEX ix_product_bestsellers_category_rank ON product_bestsellers (category_id, category_rank)")
+
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS product_bestsellers")
@@ -0,0 +1,25 @@
+"""Add GIN indexes on product color and size options
+
+Revision ID: c5f3a8e1d207
+Revises: b8e2a9d4c671
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c5f3a8e1d207'
+down_revision = 'b8e2a9d4c671'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_products_color_options', 'products', ['color_options'], postgresql_using='gin')
+    op.create_index('ix_products_size_options', 'products', ['size_options'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_products_size_options', table_name='products')
+    op.drop_index('ix_products_color_options', table_name='products')
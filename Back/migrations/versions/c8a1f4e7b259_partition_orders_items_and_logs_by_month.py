@@ -0,0 +1,143 @@
+"""Partition orders, order_items and inventory_logs by month on created_at
+
+Revision ID: c8a1f4e7b259
+Revises: b3f8e6a2c195
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c8a1f4e7b259'
+down_revision = 'b3f8e6a2c195'
+branch_labels = None
+depends_on = None
+
+TABLES = ('orders', 'order_items', 'inventory_logs')
+
+# Monthly partitions created beyond the current month; later ones are
+# created by the create-partitions command / maintenance job
+MONTHS_AHEAD = 3
+
+# Indexes and constraints other than the primary key, per layout
+PARTITIONED_DDL = {
+    'orders': [
+        'CREATE INDEX ix_orders_created_at_id ON orders (created_at, id)',
+        'CREATE INDEX ix_orders_created_at_status ON orders (created_at, status) INCLUDE (total_amount)',
+        'ALTER TABLE orders ADD CONSTRAINT uq_orders_order_number UNIQUE (order_number, created_at)',
+        'ALTER TABLE orders ADD CONSTRAINT orders_customer_id_fkey FOREIGN KEY (customer_id) REFERENCES customers (id)',
+    ],
+    'order_items': [
+        'CREATE INDEX ix_order_items_order_id ON order_items (order_id)',
+        'ALTER TABLE order_items ADD CONSTRAINT order_items_product_id_fkey FOREIGN KEY (product_id) REFERENCES products (id)',
+    ],
+    'inventory_logs': [
+        'ALTER TABLE inventory_logs ADD CONSTRAINT inventory_logs_product_id_fkey FOREIGN KEY (product_id) REFERENCES products (id)',
+    ],
+}
+PLAIN_DDL = {
+    'orders': [
+        'CREATE INDEX ix_orders_created_at_id ON orders (created_at, id)',
+        'CREATE INDEX ix_orders_created_at_status ON orders (created_at, status) INCLUDE (total_amount)',
+        'ALTER TABLE orders ADD CONSTRAINT orders_order_number_key UNIQUE (order_number)',
+        'ALTER TABLE orders ADD CONSTRAINT orders_customer_id_fkey FOREIGN KEY (customer_id) REFERENCES customers (id)',
+    ],
+    'order_items': [
+        'ALTER TABLE order_items ADD CONSTRAINT order_items_product_id_fkey FOREIGN KEY (product_id) REFERENCES products (id)',
+    ],
+    'inventory_logs': [
+        'ALTER TABLE inventory_logs ADD CONSTRAINT inventory_logs_product_id_fkey FOREIGN KEY (product_id) REFERENCES products (id)',
+    ],
+}
+
+BESTSELLER_INDEXES = [
+    'CREATE UNIQUE INDEX ix_product_bestsellers_product_id ON product_bestsellers (product_id)',
+    'CREATE INDEX ix_product_bestsellers_overall_rank ON product_bestsellers (overall_rank)',
+    'CREATE INDEX ix_product_bestsellers_category_rank ON product_bestsellers (category_id, category_rank)',
+]
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _drop_bestsellers_view():
+    """The materialized view reads orders and order_items; drop it and return its query"""
+    bind = op.get_bind()
+    definition = bind.execute(sa.text(
+        "SELECT pg_get_viewdef(to_regclass('product_bestsellers'))"
+    )).scalar()
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS product_bestsellers')
+    return definition
+
+
+def _create_bestsellers_view(definition):
+    if definition is None:
+        return
+    op.execute(f"CREATE MATERIALIZED VIEW product_bestsellers AS {definition.rstrip().rstrip(';')}")
+    for statement in BESTSELLER_INDEXES:
+        op.execute(statement)
+
+
+def _rebuild(table, partitioned):
+    """Copy table into a new table with the other layout, then swap them"""
+    bind = op.get_bind()
+    old = f'{table}_old'
+
+    # The sequence outlives the old table and keeps numbering the new one
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+
+    if partitioned:
+        # The partition key cannot be NULL once it is part of the primary key
+        op.execute(f"UPDATE {old} SET created_at = COALESCE(updated_at, now() AT TIME ZONE 'utc') "
+                   f"WHERE created_at IS NULL")
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)')
+
+        current = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        first = bind.execute(sa.text(f"SELECT date_trunc('month', min(created_at)) FROM {old}")).scalar()
+        month = min(first or current, current)
+        while month <= _add_months(current, MONTHS_AHEAD):
+            upper = _add_months(month, 1)
+            op.execute(f"CREATE TABLE {table}_y{month.year}m{month.month:02d} PARTITION OF {table} "
+                       f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')")
+            month = upper
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    else:
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN created_at DROP NOT NULL')
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'DROP TABLE {old}')  # drops its partitions as well
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+    for statement in (PARTITIONED_DDL if partitioned else PLAIN_DDL)[table]:
+        op.execute(statement)
+
+
+def upgrade():
+    definition = _drop_bestsellers_view()
+    # orders.id alone is no longer unique to PostgreSQL, so nothing can
+    # reference it; the ORM relationship keeps working without the key
+    op.drop_constraint('order_items_order_id_fkey', 'order_items', type_='foreignkey')
+
+    for table in TABLES:
+        _rebuild(table, partitioned=True)
+
+    _create_bestsellers_view(definition)
+
+
+def downgrade():
+    definition = _drop_bestsellers_view()
+
+    for table in TABLES:
+        _rebuild(table, partitioned=False)
+
+    op.create_foreign_key('order_items_order_id_fkey', 'order_items', 'orders', ['order_id'], ['id'])
+    _create_bestsellers_view(definition)
@@ -0,0 +1,51 @@
+"""Add order aggregates to customers
+
+Revision ID: d3e9b2f8a416
+Revises: c8a1f4e7b259
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd3e9b2f8a416'
+down_revision = 'c8a1f4e7b259'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('customers', sa.Column('order_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('customers', sa.Column('lifetime_value', sa.Numeric(precision=12, scale=2), nullable=False, server_default='0'))
+    op.add_column('customers', sa.Column('last_order_at', sa.DateTime(), nullable=True))
+    op.add_column('customers', sa.Column('average_order_value', sa.Numeric(precision=12, scale=2), sa.Computed(
+        'CASE WHEN order_count > 0 THEN round(lifetime_value / order_count, 2) END'
+    ), nullable=True))
+
+    # Backfill from the existing orders in one pass
+    op.execute("""
+        UPDATE customers
+        SET order_count = totals.order_count,
+            lifetime_value = totals.lifetime_value,
+            last_order_at = totals.last_order_at
+        FROM (
+            SELECT customer_id,
+                   count(*) FILTER (WHERE status <> 'cancelled') AS order_count,
+                   COALESCE(sum(total_amount) FILTER (
+                       WHERE status <> 'cancelled' AND payment_status = 'completed'
+                   ), 0) AS lifetime_value,
+                   max(created_at) AS last_order_at
+            FROM orders
+            WHERE customer_id IS NOT NULL
+            GROUP BY customer_id
+        ) AS totals
+        WHERE customers.id = totals.customer_id
+    """)
+
+
+def downgrade():
+    op.drop_column('customers', 'average_order_value')
+    op.drop_column('customers', 'last_order_at')
+    op.drop_column('customers', 'lifetime_value')
+    op.drop_column('customers', 'order_count')
@@ -0,0 +1,48 @@
+"""Add denormalized rating totals to products
+
+Revision ID: d4a8e2f61b90
+Revises: c1d234567890
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8e2f61b90'
+down_revision = 'c1d234567890'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill totals from existing reviews
+    op.execute("""
+        UPDATE products SET
+            rating_sum = totals.rating_sum,
+            rating_count = totals.rating_count
+        FROM (
+            SELECT product_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+            FROM product_reviews
+            GROUP BY product_id
+        ) AS totals
+        WHERE products.id = totals.product_id
+    """)
+
+    op.create_index(
+        'ix_products_average_rating',
+        'products',
+        [sa.text('coalesce(CAST(rating_sum AS FLOAT) / CAST(nullif(rating_count, 0) AS FLOAT), 0)')]
+    )
+
+
+def downgrade():
+    op.drop_index('ix_products_average_rating', table_name='products')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
@@ -0,0 +1,41 @@
+"""Add stock_reservations table
+
+Revision ID: d9a4b6e2f318
+Revises: c5f3a8e1d207
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd9a4b6e2f318'
+down_revision = 'c5f3a8e1d207'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_reservations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('token', sa.String(length=36), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('color', sa.String(length=50), nullable=True),
+        sa.Column('size', sa.String(length=50), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_reservations_token', 'stock_reservations', ['token'])
+    op.create_index('ix_stock_reservations_expires_at', 'stock_reservations', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_stock_reservations_expires_at', table_name='stock_reservations')
+    op.drop_index('ix_stock_reservations_token', table_name='stock_reservations')
+    op.drop_table('stock_reservations')
@@ -0,0 +1,41 @@
+"""Add trigram search indexes and phone_digits to customers
+
+Revision ID: e5b1c7d9f320
+Revises: d3e9b2f8a416
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1c7d9f320'
+down_revision = 'd3e9b2f8a416'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_COLUMNS = ('name', 'email', 'phone_digits')
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column('customers', sa.Column(
+        'phone_digits',
+        sa.String(length=20),
+        sa.Computed("regexp_replace(coalesce(phone, ''), '\\D', '', 'g')", persisted=True),
+        nullable=True
+    ))
+    for column in TRIGRAM_COLUMNS:
+        op.create_index(
+            f'ix_customers_{column}_trgm',
+            'customers',
+            [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'}
+        )
+
+
+def downgrade():
+    for column in TRIGRAM_COLUMNS:
+        op.drop_index(f'ix_customers_{column}_trgm', table_name='customers')
+    op.drop_column('customers', 'phone_digits')
@@ -0,0 +1,48 @@
+"""Add full-text search vectors to products
+
+Revision ID: e7c91d3a5f02
+Revises: d4a8e2f61b90
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'e7c91d3a5f02'
+down_revision = 'd4a8e2f61b90'
+branch_labels = None
+depends_on = None
+
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'fr': 'french',
+    'ar': 'arabic'
+}
+
+
+def upgrade():
+    for lang, config in SEARCH_CONFIGS.items():
+        op.add_column('products', sa.Column(
+            f'search_vector_{lang}',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                f"setweight(to_tsvector('{config}', coalesce(name, '')), 'A') || "
+                f"setweight(to_tsvector('{config}', coalesce(description, '')), 'B')",
+                persisted=True
+            ),
+            nullable=True
+        ))
+        op.create_index(
+            f'ix_products_search_vector_{lang}',
+            'products',
+            [f'search_vector_{lang}'],
+            postgresql_using='gin'
+        )
+
+
+def downgrade():
+    for lang in SEARCH_CONFIGS:
+        op.drop_index(f'ix_products_search_vector_{lang}', table_name='products')
+        op.drop_column('products', f'search_vector_{lang}')
@@ -0,0 +1,27 @@
+"""Add (created_at, id) indexes for keyset pagination
+
+Revision ID: f1b5c8d2e403
+Revises: e7c91d3a5f02
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f1b5c8d2e403'
+down_revision = 'e7c91d3a5f02'
+branch_labels = None
+depends_on = None
+
+TABLES = ['products', 'orders', 'customers', 'contact_messages']
+
+
+def upgrade():
+    for table in TABLES:
+        op.create_index(f'ix_{table}_created_at_id', table, ['created_at', 'id'])
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_created_at_id', table_name=table)
@@ -0,0 +1,24 @@
+"""Add (created_at, status) index for order statistics
+
+Revision ID: f6b3d8c2a957
+Revises: e2c7f9a1b436
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f6b3d8c2a957'
+down_revision = 'e2c7f9a1b436'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_orders_created_at_status', 'orders', ['created_at', 'status'],
+                    postgresql_include=['total_amount'])
+
+
+def downgrade():
+    op.drop_index('ix_orders_created_at_status', table_name='orders')
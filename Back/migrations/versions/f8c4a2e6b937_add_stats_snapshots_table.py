@@ -0,0 +1,29 @@
+"""Add stats_snapshots table
+
+Revision ID: f8c4a2e6b937
+Revises: e5b1c7d9f320
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f8c4a2e6b937'
+down_revision = 'e5b1c7d9f320'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stats_snapshots',
+        sa.Column('key', sa.String(length=100), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('stats_snapshots')
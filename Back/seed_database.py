@@ -273,6 +273,8 @@ def seed_orders(customers, products):
             )
             db.session.add(order_item)
     
+    # Orders were inserted directly, so bring the customer totals up to date
+    Customer.refresh_aggregates()
     db.session.commit()
     print(f"✅ Added {len(SAMPLE_ORDERS)} orders")
 
@@ -0,0 +1,109 @@
+"""
+Checkout concurrency stress test for OurStore
+Fires many parallel orders at a single SKU and checks that stock never goes
+negative and every unit sold is accounted for.
+
+Usage (against a local PostgreSQL database, never production):
+    DATABASE_URL=postgresql://localhost/ourstore_dev python stress_checkout.py --orders 300 --stock 50
+"""
+
+import argparse
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from app.factory import create_app
+from app.core.database import db
+from app.models import Customer, Product, Order, OrderItem, InventoryLog
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Stress test concurrent checkout of one product')
+    parser.add_argument('--orders', type=int, default=300, help='number of orders to place')
+    parser.add_argument('--threads', type=int, default=12, help='concurrent clients (keep below the connection pool size)')
+    parser.add_argument('--stock', type=int, default=50, help='starting stock of the product')
+    parser.add_argument('--quantity', type=int, default=1, help='units per order')
+    parser.add_argument('--keep', action='store_true', help='keep the created rows for inspection')
+    return parser.parse_args()
+
+def create_fixtures(stock):
+    """Create a throwaway customer and product to order against"""
+    tag = uuid.uuid4().hex[:8]
+    customer = Customer(name=f'Stress {tag}', email=f'stress-{tag}@example.com')
+    product = Product(name=f'Stress {tag}', price=10, stock=stock, sku=f'STRESS-{tag}')
+    db.session.add_all([customer, product])
+    db.session.commit()
+    return customer.id, product.id
+
+def remove_fixtures(customer_id, product_id):
+    """Delete everything the run created"""
+    order_ids = [order_id for (order_id,) in db.session.query(Order.id).filter_by(customer_id=customer_id)]
+    if order_ids:
+        OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
+        Order.query.filter(Order.id.in_(order_ids)).delete(synchronize_session=False)
+    InventoryLog.query.filter_by(product_id=product_id).delete(synchronize_session=False)
+    Product.query.filter_by(id=product_id).delete(synchronize_session=False)
+    Customer.query.filter_by(id=customer_id).delete(synchronize_session=False)
+    db.session.commit()
+
+def main():
+    args = parse_args()
+    if not os.environ.get('DATABASE_URL'):
+        sys.exit('Set DATABASE_URL to a local PostgreSQL database first')
+
+    app = create_app()
+    with app.app_context():
+        customer_id, product_id = create_fixtures(args.stock)
+
+    order = {
+        'customer_id': customer_id,
+        'items': [{'product_id': product_id, 'quantity': args.quantity}],
+        'shipping_address': {'address': 'Stress test'}
+    }
+    # Hold every client at the gate so the first requests really overlap
+    gate = threading.Barrier(min(args.threads, args.orders))
+    local = threading.local()
+
+    def place_order(_):
+        if not getattr(local, 'started', False):
+            local.started = True
+            gate.wait()
+        response = app.test_client().post('/api/orders', json=order)
+        return response.status_code
+
+    print(f'🚀 Placing {args.orders} orders of {args.quantity} from {args.threads} threads, stock {args.stock}')
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        statuses = Counter(pool.map(place_order, range(args.orders)))
+
+    with app.app_context():
+        stock = db.session.query(Product.stock).filter_by(id=product_id).scalar()
+        units_ordered = db.session.query(db.func.coalesce(db.func.sum(OrderItem.quantity), 0))\
+                                  .select_from(OrderItem).join(Order, Order.id == OrderItem.order_id)\
+                                  .filter(Order.customer_id == customer_id).scalar()
+        units_logged = -db.session.query(db.func.coalesce(db.func.sum(InventoryLog.quantity_change), 0))\
+                                  .filter_by(product_id=product_id).scalar()
+
+        expected_sold = min(args.orders, args.stock // args.quantity) * args.quantity
+        checks = {
+            'stock never negative': stock >= 0,
+            'no oversell': units_ordered <= args.stock,
+            'every available unit sold': units_ordered == expected_sold,
+            'stock matches orders': stock == args.stock - units_ordered,
+            'inventory log matches orders': units_logged == units_ordered,
+            'only 201/400 responses': set(statuses) <= {201, 400}
+        }
+
+        print(f'📊 Responses: {dict(statuses)}')
+        print(f'📦 Final stock {stock}, units ordered {units_ordered}, units logged {units_logged}')
+        for name, passed in checks.items():
+            print(f"{'✅' if passed else '❌'} {name}")
+
+        if not args.keep:
+            remove_fixtures(customer_id, product_id)
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+if __name__ == '__main__':
+    main()
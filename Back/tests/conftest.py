@@ -0,0 +1,62 @@
+"""
+Test fixtures
+Tests run against the PostgreSQL database in TEST_DATABASE_URL (see
+TestingConfig); its tables are created once per run and emptied after
+every test
+"""
+
+import contextlib
+import pytest
+from sqlalchemy import event, text
+from app.factory import create_app
+from app.core.cache import cache
+from app.core.database import db
+
+@pytest.fixture(scope='session')
+def app():
+    """Application on the test database (pytest-flask builds client from it)"""
+    app = create_app('testing')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture(autouse=True)
+def clean_state(app):
+    """Start every test with an empty cache and leave empty tables behind"""
+    cache.init_app(app)
+    yield
+    db.session.remove()
+    tables = ', '.join(table.name for table in db.metadata.sorted_tables)
+    db.session.execute(text(f'TRUNCATE {tables} RESTART IDENTITY CASCADE'))
+    db.session.commit()
+
+@pytest.fixture
+def count_queries():
+    """Context manager collecting the SQL statements run inside it
+
+        with count_queries() as statements:
+            client.get('/api/products')
+        assert len(statements) == 3
+
+    The session is cleared first, so rows the test created are loaded
+    from the database rather than found in the identity map.
+    """
+    @contextlib.contextmanager
+    def counting():
+        db.session.remove()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    return counting
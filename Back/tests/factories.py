@@ -0,0 +1,54 @@
+"""
+Test data builders
+Each helper adds rows with unique names, commits and returns their ids
+(ids stay usable after the session is cleared, instances do not)
+"""
+
+import itertools
+from app.core.database import db
+from app.models import Category, Product, Customer, Order, OrderItem
+
+_sequence = itertools.count(1)
+
+def add_categories(count):
+    categories = []
+    for _ in range(count):
+        number = next(_sequence)
+        categories.append(Category(name=f'Category {number}', name_code=f'categories.c{number}'))
+    db.session.add_all(categories)
+    db.session.commit()
+    return [category.id for category in categories]
+
+def add_products(category_ids, count):
+    """count products spread round-robin over the categories"""
+    products = [
+        Product(name=f'Product {next(_sequence)}', price=10 + index, stock=100,
+                category_id=category_ids[index % len(category_ids)])
+        for index in range(count)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return [product.id for product in products]
+
+def add_customers(count):
+    customers = []
+    for _ in range(count):
+        number = next(_sequence)
+        customers.append(Customer(name=f'Customer {number}', email=f'customer{number}@example.com'))
+    db.session.add_all(customers)
+    db.session.commit()
+    return [customer.id for customer in customers]
+
+def add_orders(customer_ids, product_ids, count, items_per_order=3, price=10):
+    """count orders spread over the customers, each with items_per_order products"""
+    orders = []
+    for index in range(count):
+        order = Order(customer_id=customer_ids[index % len(customer_ids)],
+                      subtotal=price * items_per_order, total_amount=price * items_per_order)
+        for offset in range(items_per_order):
+            product_id = product_ids[(index + offset) % len(product_ids)]
+            order.order_items.append(OrderItem(product_id=product_id, quantity=1, price=price))
+        orders.append(order)
+    db.session.add_all(orders)
+    db.session.commit()
+    return [order.id for order in orders]
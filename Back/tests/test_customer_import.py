@@ -0,0 +1,85 @@
+"""
+Customer import tests
+"""
+
+from app.core.database import db
+from app.models import BackgroundJob, Customer
+from tests.factories import add_customers
+
+def _post_csv(client, content):
+    return client.post('/api/admin/customers/import?format=csv', data=content.encode(),
+                       content_type='text/csv')
+
+def _dashboard_refreshes():
+    return BackgroundJob.query.filter_by(name='stats.refresh_snapshot').count()
+
+def test_import_queues_a_dashboard_refresh(client):
+    response = _post_csv(client, 'name,email\nAda,ada@example.com\n')
+    assert response.status_code == 200
+    assert _dashboard_refreshes() == 1
+
+def test_rejected_file_queues_no_dashboard_refresh(client):
+    response = _post_csv(client, 'name\nAda\n')
+    assert response.status_code == 400
+    assert 'email' in response.json['error']
+
+    response = client.post('/api/admin/customers/import?format=xml', data=b'<customers/>')
+    assert response.status_code == 400
+    assert _dashboard_refreshes() == 0
+
+def test_last_duplicate_wins_and_earlier_ones_are_rejected(client):
+    response = _post_csv(client, 'name,email,city\n'
+                                 'Ada,ada@example.com,Tunis\n'
+                                 'Bob,bob@example.com,Sfax\n'
+                                 'Ada Lovelace,ada@example.com,\n')
+    assert response.status_code == 200
+    assert response.json['inserted'] == 2
+    assert response.json['rejected'] == 1
+    assert response.json['errors'] == [{'line': 2, 'error': 'ada@example.com appears again later in the file'}]
+
+    ada = Customer.query.filter_by(email='ada@example.com').one()
+    assert ada.name == 'Ada Lovelace'
+    assert ada.city is None
+
+def test_bad_lines_are_rejected_and_the_rest_imported(client):
+    response = _post_csv(client, 'name,email,date_of_birth,is_active\n'
+                                 'Ada,ada@example.com,1990-01-31,yes\n'
+                                 ',nameless@example.com,,\n'
+                                 'Bob,not-an-email,,\n'
+                                 'Cy,cy@example.com,31/01/1990,\n'
+                                 'Di,di@example.com,,maybe\n')
+    assert response.status_code == 200
+    assert (response.json['inserted'], response.json['rejected']) == (1, 4)
+    assert [error['line'] for error in response.json['errors']] == [3, 4, 5, 6]
+    assert response.json['errors'][0]['error'] == 'name is required'
+    assert [customer.email for customer in Customer.query.all()] == ['ada@example.com']
+
+def test_import_updates_existing_customers_by_email(client):
+    customer_id, = add_customers(1)
+    customer = db.session.get(Customer, customer_id)
+    email = customer.email
+    customer.phone = '+216 71 000 000'
+    db.session.commit()
+
+    response = _post_csv(client, f'name,email,city\nRenamed,{email},Sousse\n')
+    assert (response.json['inserted'], response.json['updated']) == (0, 1)
+
+    db.session.remove()
+    customer = db.session.get(Customer, customer_id)
+    assert (customer.name, customer.city, customer.phone) == ('Renamed', 'Sousse', '+216 71 000 000')
+
+def test_missing_header_imports_nothing(client):
+    response = _post_csv(client, 'full_name,mail\nAda,ada@example.com\n')
+    assert response.status_code == 400
+    assert response.json['error'] == 'CSV header is missing: email, name'
+    assert Customer.query.count() == 0
+
+def test_ndjson_lines_are_validated(client):
+    content = '{"name": "Ada", "email": "ada@example.com"}\nnot json\n[1, 2]\n'
+    response = client.post('/api/admin/customers/import?format=ndjson', data=content.encode())
+    assert response.status_code == 200
+    assert response.json['inserted'] == 1
+    assert response.json['errors'] == [
+        {'line': 2, 'error': 'Invalid JSON'},
+        {'line': 3, 'error': 'Expected a JSON object'}
+    ]
@@ -0,0 +1,74 @@
+"""
+Customer API tests
+"""
+
+from decimal import Decimal
+from app.core.database import db
+from app.models import Customer
+from tests.factories import add_categories, add_products, add_customers
+
+def _place_order(client, customer_id, product_id, quantity):
+    response = client.post('/api/orders', json={
+        'customer_id': customer_id,
+        'shipping_address': '1 Main Street',
+        'items': [{'product_id': product_id, 'quantity': quantity}]
+    })
+    assert response.status_code == 201
+    return response.json['id']
+
+def _aggregates(customer_id):
+    db.session.remove()
+    customer = db.session.get(Customer, customer_id)
+    return customer.order_count, customer.lifetime_value
+
+def test_aggregates_follow_payment_and_cancellation(client):
+    product_id, = add_products(add_categories(1), 1)  # priced 10
+    customer_id, = add_customers(1)
+
+    first = _place_order(client, customer_id, product_id, 2)
+    assert _aggregates(customer_id) == (1, Decimal('0.00'))
+
+    # Only completed payments count towards lifetime_value
+    client.put(f'/api/orders/{first}', json={'payment_status': 'completed'})
+    assert _aggregates(customer_id) == (1, Decimal('20.00'))
+
+    second = _place_order(client, customer_id, product_id, 3)
+    client.put(f'/api/orders/{second}', json={'payment_status': 'completed'})
+    assert _aggregates(customer_id) == (2, Decimal('50.00'))
+
+    client.put(f'/api/orders/{second}', json={'payment_status': 'refunded'})
+    assert _aggregates(customer_id) == (2, Decimal('20.00'))
+
+    # Cancelling through a status update and through DELETE
+    client.put(f'/api/orders/{first}', json={'status': 'cancelled'})
+    assert _aggregates(customer_id) == (1, Decimal('0.00'))
+
+    third = _place_order(client, customer_id, product_id, 1)
+    client.put(f'/api/orders/{third}', json={'payment_status': 'completed'})
+    assert _aggregates(customer_id) == (2, Decimal('10.00'))
+    assert client.delete(f'/api/orders/{third}').status_code == 200
+    assert _aggregates(customer_id) == (1, Decimal('0.00'))
+
+    # The running totals agree with a recomputation from the orders
+    stored = _aggregates(customer_id)
+    Customer.refresh_aggregates()
+    db.session.commit()
+    assert _aggregates(customer_id) == stored
+
+def test_bulk_cancel_updates_every_customer(client):
+    product_id, = add_products(add_categories(1), 1)
+    customer_ids = add_customers(2)
+    order_ids = []
+    for customer_id in customer_ids:
+        for _ in range(2):
+            order_id = _place_order(client, customer_id, product_id, 1)
+            client.put(f'/api/orders/{order_id}', json={'payment_status': 'completed'})
+            order_ids.append(order_id)
+
+    # One order of the first customer, both of the second
+    response = client.patch('/api/orders/bulk', json={'status': 'cancelled', 'order_ids': order_ids[1:]})
+    assert response.json['updated'] == 3
+
+    assert _aggregates(customer_ids[0]) == (1, Decimal('10.00'))
+    assert _aggregates(customer_ids[1]) == (0, Decimal('0.00'))
+    assert client.get(f'/api/customers/{customer_ids[1]}').json['total_spent'] == '0.00'
@@ -0,0 +1,56 @@
+"""
+Idempotency-Key tests
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from app.core.database import db
+from app.models import Order
+from app.models.idempotency import IdempotencyKey
+from app.utils import idempotency
+from tests.factories import add_categories, add_products, add_customers
+
+def _order_request():
+    product_id, = add_products(add_categories(1), 1)
+    customer_id, = add_customers(1)
+    return {
+        'customer_id': customer_id,
+        'shipping_address': '1 Main Street',
+        'items': [{'product_id': product_id, 'quantity': 1}]
+    }
+
+def test_retry_replays_the_stored_order(client):
+    body = _order_request()
+    headers = {'Idempotency-Key': 'order-1'}
+
+    first = client.post('/api/orders', json=body, headers=headers)
+    retry = client.post('/api/orders', json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.json == first.json
+    assert Order.query.count() == 1
+
+def test_crash_after_commit_does_not_create_a_second_order(app, client, monkeypatch):
+    body = _order_request()
+    headers = {'Idempotency-Key': 'order-2'}
+
+    def crash(scope, key, response):
+        raise RuntimeError('worker killed')
+
+    # The process dies after the order committed, before the wrapper's own commit
+    with monkeypatch.context() as patch:
+        patch.setattr(idempotency, '_finish', crash)
+        with pytest.raises(RuntimeError):
+            client.post('/api/orders', json=body, headers=headers)
+    db.session.rollback()
+
+    # Long enough for a 'processing' key to count as stalled and be taken over
+    timeout = app.config['IDEMPOTENCY_PROCESSING_TIMEOUT']
+    IdempotencyKey.query.update({'created_at': datetime.utcnow() - timedelta(seconds=timeout + 60)})
+    db.session.commit()
+
+    retry = client.post('/api/orders', json=body, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert Order.query.count() == 1
@@ -0,0 +1,34 @@
+"""
+Database job queue tests
+"""
+
+from datetime import datetime, timedelta
+from app.core.database import db
+from app.core.jobs import jobs
+from app.models.job import BackgroundJob
+
+def _add_job(name, status, dedupe_key=None, payload=None, run_at=None, locked_at=None):
+    background_job = BackgroundJob(name=name, payload=payload or {}, status=status, attempts=1 if locked_at else 0,
+                                   run_at=run_at or datetime.utcnow(), locked_at=locked_at, dedupe_key=dedupe_key)
+    db.session.add(background_job)
+    db.session.commit()
+    return background_job.id
+
+def test_stale_job_with_queued_duplicate_does_not_wedge_the_queue(app):
+    long_ago = datetime.utcnow() - timedelta(seconds=app.config['JOB_LOCK_TIMEOUT'] + 60)
+    tomorrow = datetime.utcnow() + timedelta(days=1)
+
+    # Worker died mid-job while the next run was already queued
+    died = _add_job('maintenance.create_partitions', 'running', 'maintenance.create_partitions', locked_at=long_ago)
+    queued = _add_job('maintenance.create_partitions', 'queued', 'maintenance.create_partitions', run_at=tomorrow)
+    # Two dead copies of the same key and one dead job without a key
+    _add_job('cache.invalidate', 'running', 'cache.invalidate:x', {'tags': []}, locked_at=long_ago)
+    _add_job('cache.invalidate', 'running', 'cache.invalidate:x', {'tags': []}, locked_at=long_ago)
+    _add_job('cache.invalidate', 'running', None, {'tags': []}, locked_at=long_ago)
+
+    assert jobs.run_pending() == 2
+    assert jobs.run_pending() == 0
+
+    remaining = BackgroundJob.query.all()
+    assert [background_job.id for background_job in remaining] == [queued]
+    assert db.session.get(BackgroundJob, died) is None
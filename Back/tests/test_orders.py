@@ -0,0 +1,182 @@
+"""
+Order API tests
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app.core.database import db
+from app.models import Order, OrderItem, Product, InventoryLog
+from tests.factories import add_categories, add_products, add_customers, add_orders
+
+def test_order_list_query_count_does_not_grow_with_orders(client, count_queries):
+    product_ids = add_products(add_categories(2), 10)
+    customer_ids = add_customers(5)
+    add_orders(customer_ids, product_ids, 2)
+
+    with count_queries() as few_orders:
+        response = client.get('/api/orders')
+    assert response.status_code == 200
+    assert len(response.json['orders']) == 2
+
+    add_orders(customer_ids, product_ids, 13)
+
+    with count_queries() as many_orders:
+        response = client.get('/api/orders')
+    assert response.status_code == 200
+    assert len(response.json['orders']) == 15
+    assert all(order['customer'] and len(order['items']) == 3 for order in response.json['orders'])
+
+    assert len(many_orders) == len(few_orders)
+
+def test_customer_orders_query_count_does_not_grow_with_orders(client, count_queries):
+    product_ids = add_products(add_categories(2), 10)
+    customer_id, = add_customers(1)
+    add_orders([customer_id], product_ids, 2)
+
+    with count_queries() as few_orders:
+        response = client.get(f'/api/customers/{customer_id}/orders')
+    assert response.status_code == 200
+    assert len(response.json['orders']) == 2
+
+    add_orders([customer_id], product_ids, 8)
+
+    with count_queries() as many_orders:
+        response = client.get(f'/api/customers/{customer_id}/orders')
+    assert response.status_code == 200
+    assert len(response.json['orders']) == 10
+
+    assert len(many_orders) == len(few_orders)
+
+def test_order_list_fields_query_count_does_not_grow_with_orders(client, count_queries):
+    product_ids = add_products(add_categories(2), 10)
+    customer_ids = add_customers(5)
+    add_orders(customer_ids, product_ids, 2)
+
+    url = '/api/orders?fields=id,customer,item_count,items'
+    with count_queries() as few_orders:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert len(response.json['orders']) == 2
+
+    add_orders(customer_ids, product_ids, 13)
+
+    with count_queries() as many_orders:
+        response = client.get(url)
+    assert response.status_code == 200
+    orders = response.json['orders']
+    assert len(orders) == 15
+    assert all(order['customer'] and order['item_count'] == 3 for order in orders)
+    assert set(orders[0]['items'][0]['product']) == {'id', 'name', 'image_url'}
+
+    assert len(many_orders) == len(few_orders)
+
+def test_order_number_is_unique_across_partitions(app):
+    customer_id, = add_customers(1)
+    db.session.add(Order(customer_id=customer_id, order_number='ORD-1', subtotal=10, total_amount=10,
+                         created_at=datetime(2026, 1, 15)))
+    db.session.commit()
+
+    db.session.add(Order(customer_id=customer_id, order_number='ORD-1', subtotal=10, total_amount=10,
+                         created_at=datetime(2026, 2, 15)))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+    assert Order.query.filter_by(order_number='ORD-1').count() == 1
+
+def test_export_rows_keeps_items_of_orders_on_the_start_bound(app):
+    product_ids = add_products(add_categories(1), 2)
+    customer_id, = add_customers(1)
+    # Stamped later than its items would be by default
+    created_at = datetime.utcnow() + timedelta(days=40)
+    order = Order(customer_id=customer_id, subtotal=20, total_amount=20, created_at=created_at)
+    for product_id in product_ids:
+        order.order_items.append(OrderItem(product_id=product_id, quantity=1, price=10))
+    db.session.add(order)
+    db.session.commit()
+
+    rows = list(Order.export_rows(start=created_at))
+    assert sorted(row['product_id'] for row in rows) == sorted(product_ids)
+
+def test_concurrent_checkouts_never_oversell(app):
+    product_id, = add_products(add_categories(1), 1)
+    db.session.get(Product, product_id).stock = 5
+    db.session.commit()
+    customer_id, = add_customers(1)
+    body = {
+        'customer_id': customer_id,
+        'shipping_address': '1 Main Street',
+        'items': [{'product_id': product_id, 'quantity': 1}]
+    }
+
+    # Every request runs in its own thread, app context and connection
+    buyers = 10
+    start = threading.Barrier(buyers)
+
+    def checkout(_):
+        client = app.test_client()
+        start.wait()
+        return client.post('/api/orders', json=body).status_code
+
+    with ThreadPoolExecutor(buyers) as pool:
+        statuses = sorted(pool.map(checkout, range(buyers)))
+
+    assert statuses == [201] * 5 + [400] * 5
+    db.session.remove()
+    assert db.session.get(Product, product_id).stock == 0
+    assert Order.query.count() == 5
+
+def test_bulk_cancel_restocks_each_product_once(client):
+    product_ids = add_products(add_categories(1), 2)
+    customer_id, = add_customers(1)
+    first, second, delivered = add_orders([customer_id], product_ids, 3, items_per_order=2)
+    db.session.get(Order, delivered).status = 'delivered'
+    db.session.commit()
+
+    body = {'status': 'cancelled', 'order_ids': [first, second, delivered, 999999]}
+    response = client.patch('/api/orders/bulk', json=body)
+    assert response.status_code == 200
+    assert sorted(response.json['order_ids']) == [first, second]
+    assert response.json['skipped'] == [delivered, 999999]
+    assert sorted((entry['product_id'], entry['quantity']) for entry in response.json['restocked']) == \
+        [(product_id, 2) for product_id in sorted(product_ids)]
+
+    db.session.remove()
+    assert [db.session.get(Product, product_id).stock for product_id in product_ids] == [102, 102]
+    returns = InventoryLog.query.filter_by(change_type='return').all()
+    assert sorted((log.product_id, log.quantity_change) for log in returns) == \
+        [(product_id, 2) for product_id in sorted(product_ids)]
+
+    # Repeating the request changes nothing
+    response = client.patch('/api/orders/bulk', json=body)
+    assert response.json['updated'] == 0
+    assert response.json['restocked'] == []
+    assert InventoryLog.query.filter_by(change_type='return').count() == 2
+
+def test_bulk_ship_by_filter_only_moves_allowed_orders(client):
+    product_ids = add_products(add_categories(1), 2)
+    customer_id, other_customer_id = add_customers(2)
+    pending, cancelled = add_orders([customer_id], product_ids, 2)
+    other, = add_orders([other_customer_id], product_ids, 1)
+    db.session.get(Order, cancelled).status = 'cancelled'
+    db.session.commit()
+
+    response = client.patch('/api/orders/bulk', json={'status': 'shipped', 'filter': {'customer_id': customer_id}})
+    assert response.status_code == 200
+    assert response.json['order_ids'] == [pending]
+    assert 'restocked' not in response.json
+
+    db.session.remove()
+    assert db.session.get(Order, pending).status == 'shipped'
+    assert db.session.get(Order, pending).shipped_at is not None
+    assert db.session.get(Order, cancelled).status == 'cancelled'
+    assert db.session.get(Order, other).status == 'pending'
+
+def test_bulk_update_needs_a_target(client):
+    response = client.patch('/api/orders/bulk', json={'status': 'shipped'})
+    assert response.status_code == 400
+    response = client.patch('/api/orders/bulk', json={'status': 'refunded', 'order_ids': [1]})
+    assert response.status_code == 400
@@ -0,0 +1,41 @@
+"""
+Keyset pagination tests
+"""
+
+import base64
+import json
+import pytest
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+def _cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('created_at:desc', 42, 7)
+    assert decode_cursor(cursor, 'created_at:desc') == (42, 7)
+
+@pytest.mark.parametrize('key', [
+    [{'dt': 'not a date'}, 1],
+    [{'dt': 12}, 1],
+    [{'dec': 'abc'}, 1],
+    [{'other': 1}, 1],
+    ['2026-01-01', 'not an id'],
+    ['2026-01-01', True],
+    [[1, 2], 1],
+    [{'dt': {'nested': 1}}, 1],
+    [{'nested': {'dt': '2026-01-01'}}, 1],
+    [True, 1],
+])
+def test_tampered_cursor_is_invalid(key):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(_cursor({'o': 'created_at:desc', 'k': key}), 'created_at:desc')
+
+@pytest.mark.parametrize('value', [None, 'Name', 3, 2.5])
+def test_plain_cursor_values_are_accepted(value):
+    cursor = _cursor({'o': 'name:asc', 'k': [value, 1]})
+    assert decode_cursor(cursor, 'name:asc') == (value, 1)
+
+def test_tampered_cursor_is_rejected_with_400(client):
+    cursor = _cursor({'o': 'created_at:desc', 'k': [{'dt': 'not a date'}, 1]})
+    response = client.get(f'/api/orders?cursor={cursor}')
+    assert response.status_code == 400
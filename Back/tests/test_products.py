@@ -0,0 +1,39 @@
+"""
+Product API tests
+"""
+
+from tests.factories import add_categories, add_products
+
+def test_product_list_query_count_does_not_grow_with_page_size(client, count_queries):
+    add_products(add_categories(4), 60)
+
+    with count_queries() as small_page:
+        response = client.get('/api/products?per_page=5')
+    assert response.status_code == 200
+    assert len(response.json['products']) == 5
+
+    with count_queries() as large_page:
+        response = client.get('/api/products?per_page=50')
+    assert response.status_code == 200
+    assert len(response.json['products']) == 50
+
+    assert len(large_page) == len(small_page)
+
+def test_featured_categories_query_count_does_not_grow_with_categories(client, count_queries):
+    add_products(add_categories(2), 6)
+
+    with count_queries() as few_categories:
+        response = client.get('/api/products/categories/featured')
+    assert response.status_code == 200
+    assert len(response.json['categories']) == 2
+
+    # Changes the validators, so this is a cache miss as well
+    add_products(add_categories(8), 24)
+
+    with count_queries() as many_categories:
+        response = client.get('/api/products/categories/featured')
+    assert response.status_code == 200
+    assert len(response.json['categories']) == 10
+    assert all(len(previews) == 3 for previews in response.json['categoryPreviews'].values())
+
+    assert len(many_categories) == len(few_categories)
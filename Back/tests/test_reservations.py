@@ -0,0 +1,45 @@
+"""
+Stock reservation tests
+"""
+
+from datetime import datetime, timedelta
+from app.core.database import db
+from app.core.jobs import jobs
+from app.models import Order, Product
+from app.models.job import BackgroundJob
+from app.models.reservation import StockReservation
+from app.tasks import schedule_reservation_sweep
+from tests.factories import add_categories, add_products, add_customers
+
+def test_expired_hold_is_swept_back_to_stock_and_cannot_be_converted(client):
+    product_id, = add_products(add_categories(1), 1)
+    customer_id, = add_customers(1)
+
+    response = client.post('/api/reservations', json={
+        'customer_id': customer_id,
+        'items': [{'product_id': product_id, 'quantity': 3}]
+    })
+    assert response.status_code == 201
+    token = response.json['token']
+    assert db.session.get(Product, product_id).stock == 97
+
+    StockReservation.query.update({'expires_at': datetime.utcnow() - timedelta(minutes=1)})
+    schedule_reservation_sweep()
+    db.session.commit()
+
+    assert jobs.run_pending() == 1
+    db.session.expire_all()
+    assert db.session.get(Product, product_id).stock == 100
+    assert StockReservation.query.count() == 0
+    # The sweep scheduled its next run
+    assert BackgroundJob.query.filter_by(name='reservations.sweep', status='queued').count() == 1
+
+    response = client.post('/api/orders', json={
+        'customer_id': customer_id,
+        'shipping_address': '1 Main Street',
+        'reservation_token': token
+    })
+    assert response.status_code == 409
+    assert Order.query.count() == 0
+    db.session.expire_all()
+    assert db.session.get(Product, product_id).stock == 100
@@ -0,0 +1,41 @@
+"""
+OurStore background job worker
+Runs the jobs queued by the API (confirmation emails, rollups, cache
+invalidation) outside the request path, plus the periodic sweep of expired
+checkout holds and partition maintenance
+
+Database backend (default, needs only PostgreSQL):
+    python worker.py
+Celery backend (JOBS_BACKEND=celery, Redis broker):
+    celery -A worker.celery worker
+"""
+
+import signal
+from app.factory import create_app
+from app.core.database import db
+from app.core.jobs import jobs
+from app.tasks import schedule_partition_maintenance, schedule_reservation_sweep
+
+app = create_app()
+
+# Celery application for the celery backend; None with the database backend
+celery = jobs.celery
+
+if __name__ == '__main__':
+    if jobs.backend != 'database':
+        raise SystemExit(f'JOBS_BACKEND is "{jobs.backend}"; start the worker with: celery -A worker.celery worker')
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    print('🚀 Job worker started (database backend)')
+    with app.app_context():
+        # Periodic jobs reschedule themselves; make sure the chain exists
+        schedule_partition_maintenance()
+        schedule_reservation_sweep()
+        db.session.commit()
+        try:
+            jobs.work(stop=lambda: bool(stopping))
+        except KeyboardInterrupt:
+            pass
+    print('👋 Job worker stopped')